@@ -0,0 +1,5 @@
+"""
+Бенчмарки бота на локальных заменах Telegram, Gemini и Google Sheets
+
+Запуск: python -m benchmarks (см. benchmarks/__main__.py)
+"""
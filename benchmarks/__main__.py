@@ -0,0 +1,177 @@
+"""
+Запуск бенчмарков без сети и учетных данных
+
+    python -m benchmarks                       # все сценарии
+    python -m benchmarks parse status          # выбранные сценарии
+    python -m benchmarks --latency-scale 0     # без задержек сервисов (только код бота)
+    python -m benchmarks --set rows=10000 --set requests=20 status
+    python -m benchmarks --json results.json   # сохранить результаты
+    python -m benchmarks --baseline results.json --tolerance 0.2  # проверка на регрессии
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import sys
+import tempfile
+
+from loguru import logger
+
+# Окружение бенчмарка задается до импорта бота (config читает его при импорте).
+# Лимиты Telegram и Gemini подняты, чтобы замерялся код бота, а не квоты;
+# переменные, уже заданные в окружении, не перезаписываются.
+ENVIRONMENT = {
+    "DATABASE_BACKEND": "sheets",
+    "BOT_TOKEN": "123456:BENCHMARK",
+    "ADMIN_USER_IDS": "1",
+    "TARGET_GROUP_ID": "-1001",
+    "GEMINI_API_KEY": "benchmark",
+    "GEMINI_REQUESTS_PER_MINUTE": "100000",
+    "GEMINI_TOKENS_PER_MINUTE": "100000000",
+    "TELEGRAM_GLOBAL_RATE_PER_SECOND": "1000",
+    "TELEGRAM_GROUP_RATE_PER_MINUTE": "100000",
+    "TELEGRAM_CHAT_RATE_PER_MINUTE": "100000",
+    "PARSER_STREAMING": "false",
+}
+
+
+SCENARIO_NAMES = ("parse", "moderation", "publish", "status")
+
+
+def setup_environment():
+    # Файлы состояния бота (курсоры, очередь публикации, кэши) - во временной папке
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="newsbot-benchmark-")
+    for key, value in ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+
+def _parse_value(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def scenario_kwargs(function, args):
+    """Параметры сценария: --set, общие параметры и масштаб задержек"""
+    parameters = inspect.signature(function).parameters
+    kwargs = {}
+    for name, parameter in parameters.items():
+        if name.endswith("_latency"):
+            kwargs[name] = parameter.default * args.latency_scale
+    for name in ("jitter", "error_rate", "seed"):
+        if getattr(args, name) is not None and name in parameters:
+            kwargs[name] = getattr(args, name)
+    for item in args.set:
+        name, _, value = item.partition("=")
+        if name in parameters:
+            kwargs[name] = _parse_value(value)
+    return kwargs
+
+
+def _seconds(value):
+    return "-" if value is None else f"{value * 1000:.1f} мс"
+
+
+def print_result(result):
+    print(
+        f"{result['scenario']}: {result['items']} шт. за {result['seconds']} с "
+        f"({result['items_per_second']}/с), p50 {_seconds(result['latency_p50'])}, "
+        f"p99 {_seconds(result['latency_p99'])}"
+    )
+    extra = {
+        key: value for key, value in result.items()
+        if key not in ("scenario", "items", "seconds", "items_per_second", "latency_p50", "latency_p99", "api")
+    }
+    if extra:
+        print("  " + ", ".join(f"{key}={value}" for key, value in extra.items()))
+    for service, report in result["api"].items():
+        calls = ", ".join(f"{method}={count}" for method, count in sorted(report["calls"].items()))
+        errors = sum(report["errors"].values())
+        print(f"  {service}: {calls or 'нет вызовов'}" + (f" (ошибок: {errors})" if errors else ""))
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Сравнение с сохраненными результатами: падение пропускной способности или
+    рост p99 больше чем на tolerance (доля) считается регрессией
+    """
+    previous = {result["scenario"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result["scenario"])
+        if not old:
+            continue
+        if old["items_per_second"] and result["items_per_second"] is not None:
+            if result["items_per_second"] < old["items_per_second"] * (1 - tolerance):
+                regressions.append(
+                    f"{result['scenario']}: пропускная способность {old['items_per_second']}/с -> "
+                    f"{result['items_per_second']}/с"
+                )
+        if old["latency_p99"] and result["latency_p99"] is not None:
+            if result["latency_p99"] > old["latency_p99"] * (1 + tolerance):
+                regressions.append(
+                    f"{result['scenario']}: p99 {_seconds(old['latency_p99'])} -> {_seconds(result['latency_p99'])}"
+                )
+    return regressions
+
+
+async def run(args):
+    from .scenarios import SCENARIOS
+
+    from bot.db import async_db
+
+    results = []
+    try:
+        for name in args.scenarios or list(SCENARIOS):
+            function = SCENARIOS[name]
+            result = await function(**scenario_kwargs(function, args))
+            print_result(result)
+            results.append(result)
+    finally:
+        await async_db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Бенчмарки бота на локальных заменах сервисов")
+    parser.add_argument("scenarios", nargs="*", help="сценарии: parse, moderation, publish, status (по умолчанию все)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="множитель задержек сервисов по умолчанию (0 - без задержек)")
+    parser.add_argument("--jitter", type=float, help="разброс задержки, доля от задержки")
+    parser.add_argument("--error-rate", type=float, help="доля вызовов, завершающихся ошибкой")
+    parser.add_argument("--seed", type=int, help="seed генератора данных и ошибок")
+    parser.add_argument("--set", action="append", default=[], metavar="ПАРАМЕТР=ЗНАЧЕНИЕ",
+                        help="параметр сценария, например rows=10000 или gemini_latency=2")
+    parser.add_argument("--json", metavar="ФАЙЛ", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", metavar="ФАЙЛ", help="сравнить с результатами из JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение для --baseline")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIO_NAMES)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    setup_environment()
+    results = asyncio.run(run(args))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = find_regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Регрессия: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""
+Локальные замены внешних сервисов бота для бенчмарков
+
+Каждая замена считает вызовы API по методам и умеет добавлять задержку
+(latency ± jitter секунд) и случайные ошибки (доля error_rate), чтобы
+воспроизводить медленный или нестабильный сервис без сети и учетных данных.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.types import Update
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+from telethon.tl.types import InputPeerChannel
+
+from bot.lifecycle import INGESTED, POSTED, legacy_flags
+
+HEADERS = [
+    "id", "source_group", "source_message_id", "original_content",
+    "processed_content", "is_approved", "is_posted", "created_at", "posted_at",
+    "state", "state_changed_at"
+]
+
+# Слова для текстов новостей: случайные сочетания не считаются дубликатами
+_WORDS = (
+    "Алания Газипаша Анталья муниципалитет дорога пляж отель аэропорт рейс туристы погода "
+    "жара дождь шторм море набережная рынок цены лира курс аренда квартира вилла застройка "
+    "полиция пожар авария больница школа фестиваль концерт выставка парк автобус маршрут "
+    "такси трамвай ремонт вода электричество отключение праздник мечеть крепость пещера "
+    "река водопад банан апельсин урожай фермер рыбак порт яхта паром виза резиденция налог "
+    "закон губернатор мэр совет решение проект строительство мост тоннель развязка"
+).split()
+
+
+class FakeServiceError(ConnectionError):
+    """Сбой фейкового сервиса (как 503 у настоящего)"""
+
+    code = 503
+
+
+class FaultInjector:
+    """Задержка и случайные ошибки вызовов"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def delay(self):
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def fails(self):
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+class _FakeService:
+    """Общая часть замен: счетчики вызовов и ошибок, задержка и отказы"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.faults = FaultInjector(latency, jitter, error_rate, seed)
+        self.calls = Counter()
+        self.errors = Counter()
+
+    async def _call_async(self, name):
+        self.calls[name] += 1
+        delay = self.faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if self.faults.fails():
+            self.errors[name] += 1
+            raise FakeServiceError(f"{name}: имитация сбоя сервиса")
+
+    def _call_sync(self, name):
+        self.calls[name] += 1
+        delay = self.faults.delay()
+        if delay:
+            time.sleep(delay)
+        if self.faults.fails():
+            self.errors[name] += 1
+            raise FakeServiceError(f"{name}: имитация сбоя сервиса")
+
+    def report(self):
+        """Число вызовов и ошибок по методам"""
+        return {"calls": dict(self.calls), "errors": dict(self.errors)}
+
+
+def news_text(rng, number):
+    """Случайный текст новости длиннее фильтра по минимальной длине"""
+    words = rng.choices(_WORDS, k=rng.randint(25, 60))
+    return f"Новость №{number}. " + " ".join(words) + "."
+
+
+# --- Telethon ---
+
+class FakeMessage:
+    """Сообщение Telethon: только поля, которые читает парсер"""
+
+    __slots__ = ("id", "text", "date")
+
+    def __init__(self, message_id, text, date):
+        self.id = message_id
+        self.text = text
+        self.date = date
+
+
+class FakeTelegramClient(_FakeService):
+    """
+    Замена telethon.TelegramClient для получения истории групп.
+
+    Сообщения отдаются страницами по PAGE_SIZE, как в Telethon: каждая страница -
+    один вызов messages.getHistory с задержкой и возможной ошибкой.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        super().__init__(latency, jitter, error_rate, seed)
+        self.groups = {}
+        self._peers = {}
+
+    def add_group(self, group, count, duplicate_rate=0.0, seed=None):
+        """
+        Сообщения группы за последние часы; доля duplicate_rate - репосты
+        уже сгенерированных текстов (их должен отсеять фильтр дубликатов)
+        """
+        rng = random.Random(seed)
+        now = datetime.now()
+        texts = [text for messages in self.groups.values() for text in (m.text for m in messages)]
+        messages = []
+        for index in range(count):
+            if texts and rng.random() < duplicate_rate:
+                text = rng.choice(texts)
+            else:
+                text = news_text(rng, f"{group}-{index}")
+            texts.append(text)
+            date = now - timedelta(minutes=count - index)
+            messages.append(FakeMessage(index + 1, text, date))
+        self.groups[group] = messages
+        self._peers[group] = InputPeerChannel(channel_id=1000 + len(self._peers), access_hash=0)
+
+    async def start(self):
+        return self
+
+    async def get_me(self):
+        return FakeMessage(0, "", None)
+
+    def is_connected(self):
+        return True
+
+    async def disconnect(self):
+        pass
+
+    async def get_input_entity(self, group):
+        await self._call_async("contacts.resolveUsername")
+        return self._peers[group]
+
+    def _group(self, entity):
+        for group, peer in self._peers.items():
+            if peer == entity or group == entity:
+                return group
+        raise ValueError(f"Неизвестная группа {entity}")
+
+    async def iter_messages(self, entity, limit=None, offset_date=None, min_id=0, reverse=False, **kwargs):
+        messages = [m for m in self.groups[self._group(entity)] if m.id > min_id]
+        if offset_date is not None:
+            # С reverse=True Telethon отдает сообщения новее offset_date, иначе - старше
+            if reverse:
+                messages = [m for m in messages if m.date >= offset_date]
+            else:
+                messages = [m for m in messages if m.date < offset_date]
+        messages.sort(key=lambda m: m.id, reverse=not reverse)
+        if limit is not None:
+            messages = messages[:limit]
+
+        for start in range(0, len(messages), self.PAGE_SIZE):
+            await self._call_async("messages.getHistory")
+            for message in messages[start:start + self.PAGE_SIZE]:
+                yield message
+        if not messages:
+            await self._call_async("messages.getHistory")
+
+    async def get_messages(self, entity, **kwargs):
+        return [message async for message in self.iter_messages(entity, **kwargs)]
+
+
+# --- Gemini ---
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel(_FakeService):
+    """
+    Замена google.generativeai.GenerativeModel: «перефразирует» текст, добавляя
+    к нему эмодзи, и отвечает JSON-массивом на пакетный запрос
+    """
+
+    _SINGLE_RE = re.compile(r"```\s*\n(.*?)\n\s*```", re.DOTALL)
+    _BATCH_MARKER = "Новости:\n"
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await self._call_async("generate_content")
+
+        if self._BATCH_MARKER in prompt:
+            items = json.loads(prompt.rsplit(self._BATCH_MARKER, 1)[1])
+            return FakeResponse(json.dumps(
+                [{"id": item["id"], "text": f"📰 {item['text']}"} for item in items],
+                ensure_ascii=False
+            ))
+
+        match = self._SINGLE_RE.search(prompt)
+        return FakeResponse(f"📰 {match.group(1).strip() if match else prompt.strip()}")
+
+
+# --- Google Sheets ---
+
+def make_sheet_rows(count, status_weights=None, sources=5, days=30, seed=None):
+    """
+    Строки листа news_articles (с заголовком) для заполнения FakeSpreadsheet
+
+    Args:
+        count (int): число статей
+        status_weights (dict): доли состояний статей (bot.lifecycle)
+        sources (int): число групп-источников
+        days (int): за сколько дней распределены даты создания
+    """
+    rng = random.Random(seed)
+    weights = status_weights or {"pending": 0.1, "scheduled": 0.05, "rejected": 0.15, "posted": 0.7}
+    statuses = rng.choices(list(weights), weights=list(weights.values()), k=count)
+    started = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / max(1, count)
+
+    rows = [list(HEADERS)]
+    for index, status in enumerate(statuses):
+        article_id = index + 1
+        text = news_text(rng, article_id)
+        created_at = started + step * index
+        changed_at = created_at + timedelta(hours=2)
+        approved, rejected, posted = legacy_flags(status)
+        rows.append([
+            str(article_id),
+            f"@source_{article_id % sources}",
+            str(article_id),
+            text,
+            "" if status == INGESTED else f"📰 {text}",
+            "REJECTED" if rejected else "TRUE" if approved else "FALSE",
+            "TRUE" if posted else "FALSE",
+            created_at.isoformat(),
+            changed_at.isoformat() if status == POSTED else "",
+            status,
+            (created_at if status == INGESTED else changed_at).isoformat(),
+        ])
+    return rows
+
+
+def _trimmed(rows):
+    """Строки листа без пустых строк в конце (так их возвращает Google Sheets)"""
+    rows = [list(row) for row in rows]
+    while rows and not any(rows[-1]):
+        rows.pop()
+    return rows
+
+
+class FakeWorksheet:
+    """
+    Замена gspread.Worksheet в памяти: методы, которые вызывает хранилище,
+    синхронные и с задержкой, как HTTP-запросы gspread (вызовы считает таблица)
+    """
+
+    def __init__(self, spreadsheet, title, rows=None, cols=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows = [list(row) for row in (rows if rows is not None else [HEADERS])]
+        self.col_count = int(cols or max(map(len, self.rows), default=len(HEADERS)))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _call(self, name):
+        self.spreadsheet._call_sync(name)
+
+    def _set(self, row, column, value):
+        if column > self.col_count:
+            raise ValueError(f"Колонка {column} за пределами листа {self.title} ({self.col_count})")
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        cells.extend([""] * (column - len(cells)))
+        cells[column - 1] = str(value)
+
+    def get_all_values(self, **kwargs):
+        self._call("get_all_values")
+        return _trimmed(self.rows)
+
+    def row_values(self, row, **kwargs):
+        self._call("row_values")
+        values = self.rows[row - 1] if row <= len(self.rows) else []
+        while values and not values[-1]:
+            values = values[:-1]
+        return list(values)
+
+    def add_cols(self, cols):
+        self._call("add_cols")
+        self.col_count += int(cols)
+
+    def get(self, range_name=None, **kwargs):
+        self._call("get")
+        row, _ = a1_to_rowcol(range_name.split(":")[0])
+        return _trimmed(self.rows[row - 1:])
+
+    def _append(self, rows):
+        # Добавление после последней непустой строки, как values.append
+        if any(len(row) > self.col_count for row in rows):
+            raise ValueError(f"Строка шире листа {self.title} ({self.col_count} колонок)")
+        self.rows = _trimmed(self.rows)
+        self.rows.extend([str(value) for value in row] for row in rows)
+
+    def append_row(self, values, **kwargs):
+        self._call("append_row")
+        self._append([values])
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows")
+        self._append(values)
+
+    def update_cell(self, row, col, value):
+        self._call("update_cell")
+        self._set(row, col, value)
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._call("update")
+        row, column = a1_to_rowcol((range_name or "A1").split(":")[0])
+        for row_offset, cells in enumerate(values):
+            for column_offset, value in enumerate(cells):
+                self._set(row + row_offset, column + column_offset, value)
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update")
+        for item in data:
+            row, column = a1_to_rowcol(item["range"].split(":")[0])
+            for row_offset, values in enumerate(item["values"]):
+                for column_offset, value in enumerate(values):
+                    self._set(row + row_offset, column + column_offset, value)
+
+
+class FakeSpreadsheet(_FakeService):
+    """Замена gspread.Spreadsheet: листы в памяти, задержка и ошибки общие для всех листов"""
+
+    def __init__(self, rows=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        super().__init__(latency, jitter, error_rate, seed)
+        self._worksheets = {"news_articles": FakeWorksheet(self, "news_articles", rows)}
+
+    def rows(self, title="news_articles"):
+        """Непустые строки листа (для проверок, без учета в вызовах API)"""
+        return _trimmed(self._worksheets[title].rows)
+
+    def worksheet(self, title):
+        self._call_sync("fetch_sheet_metadata")
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def worksheets(self):
+        self._call_sync("fetch_sheet_metadata")
+        return list(self._worksheets.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._call_sync("add_worksheet")
+        worksheet = self._worksheets[title] = FakeWorksheet(self, title, rows=[], cols=cols)
+        return worksheet
+
+
+# --- aiogram ---
+
+class FakeTelegramSession(BaseSession):
+    """
+    Сессия aiogram без сети: настоящий Bot с этой сессией проходит всю цепочку
+    aiogram (сериализация методов, разбор ответов, исключения), но ответы
+    Bot API формируются локально. Сбой отдается как 429 с retry_after.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, retry_after=1, seed=None):
+        super().__init__()
+        self.faults = FaultInjector(latency, jitter, error_rate, seed)
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.errors = Counter()
+        # (ID чата, ID сообщения) -> сообщение в формате Bot API
+        self.messages = {}
+        self._message_ids = itertools.count(1)
+
+    def report(self):
+        return {"calls": dict(self.calls), "errors": dict(self.errors)}
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        raise NotImplementedError
+        yield b""
+
+    async def make_request(self, bot, method, timeout=None):
+        name = method.__api_method__
+        self.calls[name] += 1
+        delay = self.faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.faults.fails():
+            self.errors[name] += 1
+            status, content = 429, {
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        else:
+            status, content = 200, {"ok": True, "result": self._result(name, method)}
+
+        response = self.check_response(bot=bot, method=method, status_code=status, content=json.dumps(content))
+        return response.result
+
+    def _message(self, chat_id, message_id, text, reply_markup):
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if int(chat_id) > 0 else "supergroup"},
+            "text": text,
+        }
+        if reply_markup is not None:
+            message["reply_markup"] = reply_markup.model_dump(exclude_none=True)
+        return message
+
+    def _result(self, name, method):
+        if name == "sendMessage":
+            message = self._message(method.chat_id, next(self._message_ids), method.text, method.reply_markup)
+            self.messages[(int(method.chat_id), message["message_id"])] = message
+            return message
+        if name == "editMessageText":
+            message = self._message(method.chat_id, method.message_id, method.text, method.reply_markup)
+            self.messages[(int(method.chat_id), method.message_id)] = message
+            return message
+        if name == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+        return True
+
+    def last_message(self, chat_id):
+        """Последнее отправленное в чат сообщение"""
+        keys = [key for key in self.messages if key[0] == chat_id]
+        return self.messages[max(keys, key=lambda key: key[1])] if keys else None
+
+
+def make_bot(session):
+    """Бот aiogram, отправляющий запросы в локальную сессию"""
+    return Bot(token="123456:BENCHMARK", session=session, parse_mode=ParseMode.HTML)
+
+
+_update_ids = itertools.count(1)
+
+
+def _user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": "Admin"}
+
+
+def command_update(bot, user_id, text):
+    """Сообщение пользователя в личном чате с ботом"""
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_update_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+        },
+    }, context={"bot": bot})
+
+
+def callback_update(bot, user_id, message, data):
+    """Нажатие инлайн-кнопки под сообщением бота"""
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": "benchmark",
+            "message": message,
+            "data": data,
+        },
+    }, context={"bot": bot})
@@ -0,0 +1,250 @@
+"""
+Сценарии бенчмарков
+
+Сценарии работают с настоящими компонентами бота (конвейер парсера, обработчики
+aiogram, очередь публикации, хранилище Google Sheets с кэшем), подменяя только
+внешние сервисы на замены из benchmarks.fakes. Модуль импортирует бота, поэтому
+окружение (DATA_DIR, лимиты) нужно подготовить до импорта - это делает
+python -m benchmarks.
+"""
+import asyncio
+import time
+
+from bot.config import config
+from bot.db import async_db
+from bot.db.sheets_database import SheetsDatabase
+from bot.gemini_helper import gemini_helper
+from bot.main import dp, send_message_to_group
+from bot.news_parser import news_parser
+from bot.publisher import publish_queue
+from bot.sender import message_sender
+
+from .fakes import (
+    FakeGenerativeModel, FakeTelegramClient, FakeTelegramSession, FakeSpreadsheet,
+    callback_update, command_update, make_bot, make_sheet_rows
+)
+
+# ID администратора, от имени которого идут команды и нажатия кнопок
+ADMIN_ID = 1
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу (None для пустого списка)"""
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(name, items, seconds, latencies, services, **extra):
+    """
+    Результат сценария
+
+    Returns:
+        dict: число обработанных элементов, пропускная способность, p50/p99
+        задержки и вызовы API каждого сервиса
+    """
+    return {
+        "scenario": name,
+        "items": items,
+        "seconds": round(seconds, 3),
+        "items_per_second": round(items / seconds, 2) if seconds > 0 else None,
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p99": percentile(latencies, 0.99),
+        "api": {service: fake.report() for service, fake in services.items()},
+        **extra,
+    }
+
+
+def _use_sheet(spreadsheet):
+    """Хранилище Google Sheets поверх локальной таблицы; возвращает время загрузки кэша"""
+    started = time.perf_counter()
+    async_db.set_database(SheetsDatabase(spreadsheet=spreadsheet))
+    return time.perf_counter() - started
+
+
+async def _feed(bot, update, failures):
+    """
+    Обработка обновления диспетчером; ошибку обработчика, как и при polling,
+    не пробрасываем, а считаем
+    """
+    started = time.perf_counter()
+    try:
+        await dp.feed_update(bot, update)
+    except Exception:
+        failures.append(update.update_id)
+    return time.perf_counter() - started
+
+
+def _use_bot(session):
+    bot = make_bot(session)
+    message_sender.set_bot(bot)
+    config.ADMIN_USER_IDS = [ADMIN_ID]
+    return bot
+
+
+async def parse_cycle(groups=3, messages_per_group=50, duplicate_rate=0.1,
+                      telethon_latency=0.2, gemini_latency=1.0, sheets_latency=0.3,
+                      jitter=0.0, error_rate=0.0, seed=1):
+    """
+    Полный цикл парсинга: получение истории групп, фильтр дубликатов, пакетное
+    перефразирование и запись статей в таблицу. Задержка - от получения
+    сообщения парсером до сохранения статьи.
+    """
+    client = FakeTelegramClient(telethon_latency, jitter * telethon_latency, error_rate, seed)
+    names = [f"@bench_source_{index}" for index in range(groups)]
+    for index, group in enumerate(names):
+        client.add_group(group, messages_per_group, duplicate_rate, seed=seed + index)
+    model = FakeGenerativeModel(gemini_latency, jitter * gemini_latency, error_rate, seed)
+    spreadsheet = FakeSpreadsheet(latency=sheets_latency, jitter=jitter * sheets_latency,
+                                  error_rate=error_rate, seed=seed)
+
+    _use_sheet(spreadsheet)
+    news_parser._client = client
+    news_parser._entities = None
+    gemini_helper._model = model
+    config.SOURCE_GROUPS = names
+    config.PARSER_MAX_MESSAGES_PER_GROUP = max(config.PARSER_MAX_MESSAGES_PER_GROUP, messages_per_group)
+
+    # Время прохождения конвейера для сохраненных статей
+    latencies = []
+    on_done = news_parser.pipeline.on_done
+
+    def record(item):
+        if item.processed_content is not None:
+            latencies.append(time.monotonic() - item.received_at)
+        if on_done is not None:
+            on_done(item)
+
+    news_parser.pipeline.on_done = record
+    try:
+        started = time.perf_counter()
+        await news_parser.parse_all_sources()
+        await async_db.flush()
+        seconds = time.perf_counter() - started
+    finally:
+        news_parser.pipeline.on_done = on_done
+        await news_parser.pipeline.stop()
+
+    return summarize(
+        "parse_cycle", len(latencies), seconds, latencies,
+        {"telethon": client, "gemini": model, "sheets": spreadsheet},
+        received=groups * messages_per_group, articles_in_sheet=len(spreadsheet.rows()) - 1,
+    )
+
+
+async def moderation_burst(pending=300, rounds=20, bulk_every=4, sheets_latency=0.3,
+                           telegram_latency=0.05, jitter=0.0, error_rate=0.0, seed=1):
+    """
+    Администратор разбирает очередь /pending: в каждом раунде одновременно нажимает
+    «✅» у всех статей страницы, а каждый bulk_every-й раунд - «✅ Все на странице».
+    Задержка - обработка одного нажатия, включая перерисовку страницы.
+    """
+    spreadsheet = FakeSpreadsheet(make_sheet_rows(pending, {"pending": 1.0}, seed=seed),
+                                  sheets_latency, jitter * sheets_latency, error_rate, seed)
+    session = FakeTelegramSession(telegram_latency, jitter * telegram_latency, error_rate, seed=seed)
+    _use_sheet(spreadsheet)
+    bot = _use_bot(session)
+
+    failures = []
+    await _feed(bot, command_update(bot, ADMIN_ID, "/pending"), failures)
+    page = session.last_message(ADMIN_ID)
+
+    def click(data):
+        return _feed(bot, callback_update(bot, ADMIN_ID, page, data), failures)
+
+    latencies = []
+    approved_before = len(publish_queue)
+    started = time.perf_counter()
+    for index in range(rounds):
+        buttons = [
+            button["callback_data"]
+            for row in page.get("reply_markup", {}).get("inline_keyboard", [])
+            for button in row
+            if button.get("callback_data", "").startswith("approve_")
+        ]
+        if not buttons:
+            break
+        if bulk_every and (index + 1) % bulk_every == 0:
+            latencies.append(await click("bulk_approve_page"))
+        else:
+            latencies.extend(await asyncio.gather(*(click(data) for data in buttons)))
+        page = session.messages[(ADMIN_ID, page["message_id"])]
+    await async_db.flush()
+    seconds = time.perf_counter() - started
+
+    approved = len(publish_queue) - approved_before
+    return summarize(
+        "moderation_burst", approved, seconds, latencies,
+        {"sheets": spreadsheet, "telegram": session},
+        clicks=len(latencies), handler_errors=len(failures),
+    )
+
+
+async def publish_drain(approved=100, sheets_latency=0.3, telegram_latency=0.05,
+                        jitter=0.0, error_rate=0.0, seed=1):
+    """
+    Публикация накопившейся очереди одобренных статей подряд, без ожидания
+    расписания. Задержка - публикация одной статьи (чтение, отправка, отметка).
+    """
+    spreadsheet = FakeSpreadsheet(make_sheet_rows(approved, {"scheduled": 1.0}, seed=seed),
+                                  sheets_latency, jitter * sheets_latency, error_rate, seed)
+    session = FakeTelegramSession(telegram_latency, jitter * telegram_latency, error_rate, seed=seed)
+    _use_sheet(spreadsheet)
+    _use_bot(session)
+    publish_queue.set_sender(send_message_to_group)
+    await publish_queue.load()
+
+    latencies = []
+    published = 0
+    started = time.perf_counter()
+    # Неудачная статья уходит в конец очереди, а после PUBLISH_MAX_ATTEMPTS
+    # попыток убирается из нее - очередь всегда опустошается
+    while len(publish_queue):
+        attempt_started = time.perf_counter()
+        _, success = await publish_queue.publish_next()
+        latencies.append(time.perf_counter() - attempt_started)
+        published += success
+    await async_db.flush()
+    seconds = time.perf_counter() - started
+
+    return summarize(
+        "publish_drain", published, seconds, latencies,
+        {"sheets": spreadsheet, "telegram": session},
+        left_in_queue=len(publish_queue),
+    )
+
+
+async def status_command(rows=50000, requests=50, sheets_latency=0.3, telegram_latency=0.05,
+                         jitter=0.0, error_rate=0.0, seed=1):
+    """
+    Команда /status на большой таблице. Отдельно замеряется загрузка листа
+    в кэш при запуске; задержка - обработка одной команды.
+    """
+    spreadsheet = FakeSpreadsheet(make_sheet_rows(rows, seed=seed), sheets_latency,
+                                  jitter * sheets_latency, 0.0, seed)
+    session = FakeTelegramSession(telegram_latency, jitter * telegram_latency, error_rate, seed=seed)
+    load_seconds = _use_sheet(spreadsheet)
+    bot = _use_bot(session)
+
+    latencies = []
+    failures = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        latencies.append(await _feed(bot, command_update(bot, ADMIN_ID, "/status"), failures))
+    seconds = time.perf_counter() - started
+
+    return summarize(
+        "status_command", requests, seconds, latencies,
+        {"sheets": spreadsheet, "telegram": session},
+        rows=rows, load_seconds=round(load_seconds, 3), handler_errors=len(failures),
+    )
+
+
+SCENARIOS = {
+    "parse": parse_cycle,
+    "moderation": moderation_burst,
+    "publish": publish_drain,
+    "status": status_command,
+}
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from datetime import datetime
+from aiohttp import web
+from loguru import logger
+
+from .config import config
+from .db import async_db
+from .lifecycle import STATES
+from .metrics import registry
+from .news_parser import news_parser
+from .publisher import publish_queue
+from .sender import message_sender
+from .stats import stats
+
+# Время запуска для /api/health
+_started_at = time.monotonic()
+
+
+@web.middleware
+async def auth_middleware(request, handler):
+    """Проверка токена API (для /api/... и /metrics), если он задан в API_TOKEN"""
+    if config.API_TOKEN and (request.path.startswith("/api/") or request.path == "/metrics"):
+        token = request.headers.get("X-API-Token") or request.query.get("token")
+        if token != config.API_TOKEN:
+            return web.json_response({"success": False, "error": "unauthorized"}, status=401)
+    return await handler(request)
+
+
+async def _request_data(request):
+    """Параметры запроса из строки запроса, формы или JSON"""
+    data = dict(request.query)
+    if request.can_read_body:
+        if request.content_type == "application/json":
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                data.update(body)
+        else:
+            data.update(await request.post())
+    return data
+
+
+async def publish_next(request):
+    """Публикация следующей статьи из очереди (вызывается n8n по расписанию)"""
+    article_id, success = await publish_queue.publish_next()
+    return web.json_response({
+        "success": success,
+        "article_id": article_id,
+        "queue_size": len(publish_queue),
+    })
+
+
+async def notify_admin(request):
+    """Отправка уведомления всем администраторам бота"""
+    data = await _request_data(request)
+    message = str(data.get("message", "")).strip()
+    if not message:
+        return web.json_response({"success": False, "error": "message is required"}, status=400)
+
+    results = await message_sender.broadcast(config.ADMIN_USER_IDS, message)
+    sent = sum(results.values())
+    return web.json_response({"success": sent > 0, "sent": sent})
+
+
+async def parse_now(request):
+    """Запуск внепланового парсинга в фоне"""
+    if news_parser.is_parsing:
+        return web.json_response({"success": True, "started": False, "reason": "already running"})
+
+    request.app["parse_task"] = asyncio.create_task(news_parser.parse_all_sources())
+    return web.json_response({"success": True, "started": True})
+
+
+async def queue_status(request):
+    """Глубина очередей (из памяти, без обращения к базе)"""
+    return web.json_response({
+        "publish_queue": len(publish_queue),
+        "parser_pipeline": news_parser.pipeline.qsize(),
+        "rewrite_retry": len(news_parser.retry_queue),
+        "parsing": news_parser.is_parsing,
+    })
+
+
+async def article_stats(request):
+    """Статистика статей, поступления и перефразирования (из счетчиков в памяти)"""
+    return web.json_response(stats.snapshot())
+
+
+async def articles_by_state(request):
+    """
+    Статьи в состоянии жизненного цикла, от новых к старым: ?state=failed,
+    limit (до 100) и after_id для следующей страницы
+    """
+    state = request.query.get("state")
+    if state not in STATES:
+        return web.json_response(
+            {"success": False, "error": f"state must be one of: {', '.join(STATES)}"}, status=400
+        )
+    try:
+        limit = min(100, max(1, int(request.query.get("limit", 20))))
+        after_id = int(request.query["after_id"]) if "after_id" in request.query else None
+    except ValueError:
+        return web.json_response({"success": False, "error": "limit and after_id must be integers"}, status=400)
+
+    rows, _, has_more = await async_db.get_articles_page(state, limit, after_id=after_id, newest_first=True)
+    articles = [
+        {"id": article_id, "source_group": source_group, "processed_content": processed, "created_at": created_at}
+        for article_id, source_group, processed, created_at in rows
+    ]
+    return web.json_response({"success": True, "state": state, "articles": articles, "has_more": has_more})
+
+
+async def archive(request):
+    """
+    Архив статей: ?id=N - статья по ID, ?month=ГГГГ-ММ - статьи за месяц,
+    без параметров - список месяцев архива
+    """
+    article_id = request.query.get("id")
+    month = request.query.get("month")
+    if article_id is not None:
+        try:
+            article_id = int(article_id)
+        except ValueError:
+            return web.json_response({"success": False, "error": "id must be an integer"}, status=400)
+        article = await async_db.get_archived_article(article_id)
+        if article is None:
+            return web.json_response({"success": False, "error": "not found"}, status=404)
+        return web.json_response({"success": True, "article": article})
+    if month is not None:
+        try:
+            datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            return web.json_response({"success": False, "error": "month must be YYYY-MM"}, status=400)
+        articles = await async_db.get_archived_articles(month)
+        return web.json_response({"success": True, "month": month, "articles": articles})
+    return web.json_response({"success": True, "months": await async_db.get_archive_months()})
+
+
+async def archive_now(request):
+    """Внеплановый перенос старых статей в архив (?days=N, по умолчанию ARCHIVE_AFTER_DAYS)"""
+    data = await _request_data(request)
+    try:
+        days = int(data.get("days", config.ARCHIVE_AFTER_DAYS))
+    except (TypeError, ValueError):
+        return web.json_response({"success": False, "error": "days must be an integer"}, status=400)
+    if days <= 0:
+        return web.json_response({"success": False, "error": "days must be positive"}, status=400)
+    archived = await async_db.archive_old_articles(days)
+    return web.json_response({"success": True, "archived": archived})
+
+
+async def metrics(request):
+    """Метрики бота в текстовом формате Prometheus"""
+    return web.Response(body=registry.render().encode("utf-8"), headers={
+        "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+        "Cache-Control": "no-store",
+    })
+
+
+async def health(request):
+    """Проверка работоспособности"""
+    return web.json_response({
+        "status": "ok",
+        "uptime_seconds": round(time.monotonic() - _started_at, 1),
+    })
+
+
+def create_app(bot, include_api=True):
+    """
+    Создание aiohttp-приложения бота
+
+    С include_api=False приложение создается пустым: в режиме BOT_RUN_MODE=webhook
+    в нем регистрируется только webhook Telegram, а эндпоинты управления
+    (/api/...) обслуживает отдельное приложение на API_HOST:API_PORT.
+    """
+    app = web.Application(middlewares=[auth_middleware])
+    app["bot"] = bot
+    app["include_api"] = include_api
+    if include_api:
+        # Действия только через POST: GET-запрос (превью ссылки, обход
+        # краулером, тег <img> на чужой странице) ничего не меняет
+        app.router.add_post("/api/publish_next", publish_next)
+        app.router.add_post("/api/notify_admin", notify_admin)
+        app.router.add_post("/api/parse_now", parse_now)
+        app.router.add_get("/api/queue", queue_status)
+        app.router.add_get("/api/stats", article_stats)
+        app.router.add_get("/api/articles", articles_by_state)
+        app.router.add_get("/api/archive", archive)
+        app.router.add_post("/api/archive/run", archive_now)
+        app.router.add_get("/api/health", health)
+        app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def start_server(app, host=None, port=None):
+    """
+    Запуск HTTP-сервера в текущем цикле событий (по умолчанию на API_HOST:API_PORT),
+    возвращает runner для остановки
+    """
+    host = host or config.API_HOST
+    port = port or config.API_PORT
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"HTTP-сервер запущен на {host}:{port}")
+    if app["include_api"] and not config.API_TOKEN and host not in ("127.0.0.1", "localhost", "::1"):
+        logger.warning(
+            f"HTTP API доступен на {config.API_HOST} без API_TOKEN: "
+            "любой, кто видит порт, может публиковать статьи и писать администраторам"
+        )
+    return runner
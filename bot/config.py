@@ -10,6 +10,14 @@ class Config(BaseModel):
     BOT_TOKEN: str = os.getenv("BOT_TOKEN", "")
     ADMIN_USER_IDS: list[int] = [int(id.strip()) for id in os.getenv("ADMIN_USER_IDS", "").split(",") if id.strip()]
     TARGET_GROUP_ID: int = int(os.getenv("TARGET_GROUP_ID", "0"))
+    # Чаты для публикации через запятую; по умолчанию - только TARGET_GROUP_ID
+    TARGET_GROUP_IDS: list[int] = [int(id.strip()) for id in os.getenv("TARGET_GROUP_IDS", "").split(",") if id.strip()] or [int(os.getenv("TARGET_GROUP_ID", "0"))]
+    
+    # Лимиты отправки сообщений ботом (ограничения Telegram) и число повторов при ошибках
+    TELEGRAM_GLOBAL_RATE_PER_SECOND: int = int(os.getenv("TELEGRAM_GLOBAL_RATE_PER_SECOND", "30"))
+    TELEGRAM_GROUP_RATE_PER_MINUTE: int = int(os.getenv("TELEGRAM_GROUP_RATE_PER_MINUTE", "20"))
+    TELEGRAM_CHAT_RATE_PER_MINUTE: int = int(os.getenv("TELEGRAM_CHAT_RATE_PER_MINUTE", "60"))
+    TELEGRAM_SEND_MAX_RETRIES: int = int(os.getenv("TELEGRAM_SEND_MAX_RETRIES", "3"))
     
     # Настройки для Google Gemini API
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
@@ -21,15 +29,107 @@ class Config(BaseModel):
     # Список групп для парсинга новостей
     SOURCE_GROUPS: list[str] = [group.strip() for group in os.getenv("SOURCE_GROUPS", "").split(",") if group.strip()]
     
+    # Способ получения обновлений: "polling" (long polling) или "webhook"
+    BOT_RUN_MODE: str = os.getenv("BOT_RUN_MODE", "polling")
+    # Публичный адрес (https://example.com), путь и секретный токен для webhook
+    WEBHOOK_BASE_URL: str = os.getenv("WEBHOOK_BASE_URL", "")
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    # Адрес и порт, на которых принимается webhook (проксируются на WEBHOOK_BASE_URL);
+    # HTTP API на этот порт не попадает
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+    
+    # Встроенный HTTP API для внешних планировщиков (n8n); по умолчанию доступен
+    # только с этой машины - для доступа из сети задайте API_HOST и API_TOKEN
+    API_ENABLED: bool = os.getenv("API_ENABLED", "true").lower() in ("1", "true", "yes")
+    API_HOST: str = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT: int = int(os.getenv("API_PORT", "5000"))
+    # Если задан, запросы к /api/ должны передавать его в заголовке X-API-Token или параметре token
+    API_TOKEN: str = os.getenv("API_TOKEN", "")
+    
+    # Хранилище статей: "sheets" (Google Sheets) или "sqlite" (локальная база)
+    DATABASE_BACKEND: str = os.getenv("DATABASE_BACKEND", "sheets")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./bot_data.db")
+    # Размер пула потоков для обращений к хранилищу из асинхронного кода
+    DB_MAX_WORKERS: int = int(os.getenv("DB_MAX_WORKERS", "4"))
+    
     # Настройки для Google Sheets
     GOOGLE_SHEET_NAME: str = os.getenv("GOOGLE_SHEET_NAME", "Post24man_Data")
     SHARE_EMAIL: str = os.getenv("SHARE_EMAIL", "")
+    # Как часто (в секундах) подтягивать из таблицы строки, добавленные извне
+    SHEETS_CACHE_TTL_SECONDS: int = int(os.getenv("SHEETS_CACHE_TTL_SECONDS", "300"))
+    # Окно (в секундах), в течение которого изменения копятся перед отправкой в таблицу
+    SHEETS_WRITE_DELAY_SECONDS: float = float(os.getenv("SHEETS_WRITE_DELAY_SECONDS", "10"))
+    
+    # Архивирование: опубликованные и отклоненные статьи старше N дней переносятся
+    # в помесячный архив (0 - не архивировать); проверка раз в ARCHIVE_INTERVAL_HOURS
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+    ARCHIVE_INTERVAL_HOURS: int = int(os.getenv("ARCHIVE_INTERVAL_HOURS", "24"))
+    
+    # Каталог для служебных файлов состояния (курсоры парсера, кэши)
+    DATA_DIR: str = os.getenv("DATA_DIR", "data")
+    
+    # Получение новых сообщений в реальном времени (периодический парсинг при этом
+    # только догружает пропущенное)
+    PARSER_STREAMING: bool = os.getenv("PARSER_STREAMING", "true").lower() in ("1", "true", "yes")
     
     # Настройки для регулярного парсинга
     PARSING_INTERVAL_MINUTES: int = int(os.getenv("PARSING_INTERVAL_MINUTES", "60"))
     
+    # Максимальная глубина (в часах) догрузки сообщений, в том числе после простоя
+    PARSER_BACKFILL_HOURS: int = int(os.getenv("PARSER_BACKFILL_HOURS", "24"))
+    # Максимум сообщений из одной группы за цикл, остальные догружаются в следующих циклах
+    PARSER_MAX_MESSAGES_PER_GROUP: int = int(os.getenv("PARSER_MAX_MESSAGES_PER_GROUP", "200"))
+    
+    # Размер индекса дубликатов и допустимое расстояние между SimHash почти одинаковых текстов
+    DEDUP_MAX_ENTRIES: int = int(os.getenv("DEDUP_MAX_ENTRIES", "10000"))
+    DEDUP_MAX_DISTANCE: int = int(os.getenv("DEDUP_MAX_DISTANCE", "3"))
+    
+    # Параллелизм стадий конвейера парсинга
+    PARSER_FETCH_CONCURRENCY: int = int(os.getenv("PARSER_FETCH_CONCURRENCY", "3"))
+    PARSER_FILTER_CONCURRENCY: int = int(os.getenv("PARSER_FILTER_CONCURRENCY", "1"))
+    PARSER_REWRITE_CONCURRENCY: int = int(os.getenv("PARSER_REWRITE_CONCURRENCY", "3"))
+    PARSER_PERSIST_CONCURRENCY: int = int(os.getenv("PARSER_PERSIST_CONCURRENCY", "2"))
+    # Сколько секунд стадия перефразирования ждет накопления пакета новостей
+    PARSER_REWRITE_BATCH_WAIT_SECONDS: float = float(os.getenv("PARSER_REWRITE_BATCH_WAIT_SECONDS", "1"))
+    # Сколько раз пытаться перефразировать сообщение (между циклами парсинга)
+    PARSER_REWRITE_MAX_ATTEMPTS: int = int(os.getenv("PARSER_REWRITE_MAX_ATTEMPTS", "5"))
+    # Максимальный размер очереди между стадиями конвейера
+    PARSER_QUEUE_SIZE: int = int(os.getenv("PARSER_QUEUE_SIZE", "100"))
+    # Сколько раз повторять запрос к Telegram после FloodWait
+    PARSER_FLOOD_WAIT_RETRIES: int = int(os.getenv("PARSER_FLOOD_WAIT_RETRIES", "3"))
+    
+    # Расписание публикации: слоты времени через запятую (например, 10:00,14:00,18:00);
+    # если слоты не заданы, статьи публикуются не чаще раза в PUBLISH_INTERVAL_MINUTES
+    PUBLISH_SLOTS: str = os.getenv("PUBLISH_SLOTS", "")
+    PUBLISH_INTERVAL_MINUTES: int = int(os.getenv("PUBLISH_INTERVAL_MINUTES", "30"))
+    # Пауза после неудачной публикации и максимальный размер очереди публикации
+    PUBLISH_RETRY_DELAY_SECONDS: int = int(os.getenv("PUBLISH_RETRY_DELAY_SECONDS", "300"))
+    PUBLISH_QUEUE_MAX_SIZE: int = int(os.getenv("PUBLISH_QUEUE_MAX_SIZE", "1000"))
+    # Число неудачных попыток, после которого статья убирается из очереди публикации
+    PUBLISH_MAX_ATTEMPTS: int = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "3"))
+    
+    # Количество статей на одной странице /pending и /approved (от 1 до 10:
+    # страница отправляется одним сообщением, превью статьи не короче 200 символов)
+    MODERATION_PAGE_SIZE: int = min(max(int(os.getenv("MODERATION_PAGE_SIZE", "3")), 1), 10)
+    
     # Максимальное количество символов для обработки Gemini
     MAX_CONTENT_LENGTH: int = 2000
+    
+    # Ограничения запросов к Gemini: запросов и токенов в минуту, одновременных запросов, повторов
+    GEMINI_REQUESTS_PER_MINUTE: int = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "30"))
+    GEMINI_TOKENS_PER_MINUTE: int = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "32000"))
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "3"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+    
+    # Пакетное перефразирование: максимум новостей и оценка входных токенов на один запрос
+    GEMINI_BATCH_SIZE: int = int(os.getenv("GEMINI_BATCH_SIZE", "5"))
+    GEMINI_BATCH_TOKEN_BUDGET: int = int(os.getenv("GEMINI_BATCH_TOKEN_BUDGET", "4000"))
+    
+    # Кэш перефразированных текстов: максимум записей и срок хранения в днях
+    REWRITE_CACHE_MAX_ENTRIES: int = int(os.getenv("REWRITE_CACHE_MAX_ENTRIES", "5000"))
+    REWRITE_CACHE_MAX_AGE_DAYS: int = int(os.getenv("REWRITE_CACHE_MAX_AGE_DAYS", "30"))
 
 # Создание экземпляра конфигурации
 config = Config() 
\ No newline at end of file
@@ -1,4 +1,12 @@
 # Файл инициализации для модуля базы данных
-from .db_factory import db
+from . import db_factory
+from .db_factory import async_db
 
-__all__ = ['db'] 
\ No newline at end of file
+__all__ = ['db', 'async_db']
+
+
+def __getattr__(name):
+    # db создается при первом обращении (см. db_factory)
+    if name == "db":
+        return db_factory.db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,182 @@
+import bisect
+import heapq
+import itertools
+
+from ..lifecycle import STATES, legacy_state
+
+
+class ArticleRecord:
+    """Строка листа news_articles в памяти (колонки в порядке FIELDS)"""
+
+    FIELDS = (
+        "id", "source_group", "source_message_id", "original_content",
+        "processed_content", "is_approved", "is_posted", "created_at", "posted_at",
+        "state", "state_changed_at"
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, row):
+        # gspread обрезает пустые ячейки в конце строки
+        row = list(row) + [""] * (len(self.FIELDS) - len(row))
+        for field, value in zip(self.FIELDS, row):
+            setattr(self, field, value)
+        self.id = int(self.id)
+        # У строк без колонки state состояние определяется по флагам
+        if self.state not in STATES:
+            self.state = legacy_state(
+                self.is_approved == "TRUE", self.is_posted == "TRUE", self.processed_content,
+                self.is_approved == "REJECTED"
+            )
+
+    @property
+    def sort_key(self):
+        return (self.created_at, self.id)
+
+    def row(self):
+        """Значения колонок строки листа"""
+        return [str(getattr(self, field)) for field in self.FIELDS]
+
+
+class ArticleIndex:
+    """
+    Индекс статей в памяти для запросов без обращения к таблице.
+
+    Статьи разложены по корзинам состояний; каждая корзина - список ключей
+    (created_at, id), отсортированный по дате создания. Первые N ожидающих или
+    запланированных статей берутся срезом корзины, а количество статей в каждом
+    состоянии - длиной корзины, без просмотра всех записей.
+    """
+
+    STATUSES = STATES
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, article_id):
+        return article_id in self.records
+
+    def get(self, article_id):
+        return self.records.get(article_id)
+
+    def clear(self):
+        self.records = {}
+        self.buckets = {status: [] for status in self.STATUSES}
+
+    def _remove_key(self, record):
+        bucket = self.buckets[record.state]
+        key = record.sort_key
+        index = bisect.bisect_left(bucket, key)
+        if index < len(bucket) and bucket[index] == key:
+            del bucket[index]
+
+    def add(self, record):
+        """Добавление или замена статьи"""
+        previous = self.records.get(record.id)
+        if previous is not None:
+            self._remove_key(previous)
+        self.records[record.id] = record
+        bisect.insort(self.buckets[record.state], record.sort_key)
+
+    def extend(self, records):
+        """Добавление многих статей с одной сортировкой корзин (загрузка таблицы)"""
+        for record in records:
+            previous = self.records.get(record.id)
+            if previous is not None:
+                self._remove_key(previous)
+            self.records[record.id] = record
+            self.buckets[record.state].append(record.sort_key)
+        for bucket in self.buckets.values():
+            bucket.sort()
+
+    def update(self, article_id, field, value):
+        """Изменение поля статьи (при смене state - с переносом в корзину нового состояния)"""
+        record = self.records.get(article_id)
+        if record is None:
+            return False
+        self._remove_key(record)
+        setattr(record, field, value)
+        bisect.insort(self.buckets[record.state], record.sort_key)
+        return True
+
+    def ids_by_source(self, status, source_group):
+        """ID статей статуса из указанного источника"""
+        return [
+            article_id for _, article_id in self.buckets[status]
+            if self.records[article_id].source_group == source_group
+        ]
+
+    def max_id(self):
+        return max(self.records, default=0)
+
+    def newest(self, status, limit):
+        """Первые limit статей статуса, от новых к старым"""
+        if limit <= 0:
+            return []
+        keys = self.buckets[status][-limit:]
+        return [self.records[article_id] for _, article_id in reversed(keys)]
+
+    def oldest(self, statuses, limit):
+        """Первые limit статей в одном или нескольких состояниях, от старых к новым"""
+        if limit <= 0:
+            return []
+        if isinstance(statuses, str):
+            statuses = (statuses,)
+        keys = heapq.merge(*(self.buckets[status] for status in statuses))
+        return [self.records[article_id] for _, article_id in itertools.islice(keys, limit)]
+
+    def page(self, statuses, limit, after=None, before=None, newest_first=False):
+        """
+        Страница статей в одном или нескольких состояниях по курсору
+
+        Args:
+            statuses: состояние статей или кортеж состояний
+            limit (int): размер страницы
+            after: ключ (created_at, id), после которого начинается страница
+            before: ключ, перед которым заканчивается страница
+            newest_first (bool): порядок показа - от новых к старым
+
+        Returns:
+            tuple: (записи в порядке показа, есть ли предыдущая страница, есть ли следующая)
+        """
+        if isinstance(statuses, str):
+            bucket = self.buckets[statuses]
+        else:
+            # Корзины нескольких состояний сливаются в один отсортированный список
+            bucket = list(heapq.merge(*(self.buckets[status] for status in statuses)))
+        total = len(bucket)
+
+        # Позиции в порядке показа; для newest_first корзина читается с конца
+        if after is not None:
+            if newest_first:
+                start = total - bisect.bisect_left(bucket, after)
+            else:
+                start = bisect.bisect_right(bucket, after)
+        elif before is not None:
+            if newest_first:
+                end = total - bisect.bisect_right(bucket, before)
+            else:
+                end = bisect.bisect_left(bucket, before)
+            start = max(0, end - limit)
+        else:
+            start = 0
+        end = min(total, start + limit) if before is None else end
+
+        if newest_first:
+            keys = bucket[total - end:total - start][::-1]
+        else:
+            keys = bucket[start:end]
+        records = [self.records[article_id] for _, article_id in keys]
+        return records, start > 0, end < total
+
+    def recent(self, limit):
+        """Последние limit статей по ID, от старых к новым"""
+        ids = heapq.nlargest(limit, self.records)
+        ids.reverse()
+        return [self.records[article_id] for article_id in ids]
+
+    def counts(self):
+        """Количество статей в каждом статусе"""
+        return {status: len(bucket) for status, bucket in self.buckets.items()}
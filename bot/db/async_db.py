@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDatabase:
+    """
+    Асинхронный фасад над синхронным хранилищем.
+
+    Вызовы хранилища (HTTP-запросы к Google Sheets, запросы SQLite) выполняются
+    в ограниченном пуле потоков, поэтому не блокируют цикл событий asyncio,
+    в котором работают aiogram и Telethon.
+
+    Само хранилище создается функцией database_factory при первом обращении
+    (тоже в пуле потоков), так что импорт модуля не подключается к Google Sheets.
+    """
+
+    def __init__(self, database_factory, max_workers=4):
+        self._factory = database_factory
+        self._database = None
+        self._init_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    @property
+    def database(self):
+        """Экземпляр хранилища (создается при первом обращении)"""
+        if self._database is None:
+            with self._init_lock:
+                if self._database is None:
+                    self._database = self._factory()
+        return self._database
+
+    @property
+    def initialized(self):
+        return self._database is not None
+
+    def set_database(self, database):
+        """Подмена хранилища готовым экземпляром (локальные замены в бенчмарках)"""
+        with self._init_lock:
+            self._database = database
+
+    def _call(self, method, *args, **kwargs):
+        return getattr(self.database, method)(*args, **kwargs)
+
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._call, method, *args, **kwargs))
+
+    async def warm_up(self):
+        """Создание хранилища заранее, при запуске бота"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, lambda: self.database)
+
+    async def add_news_article(self, source_group, original_content, source_message_id=None):
+        return await self._run("add_news_article", source_group, original_content, source_message_id)
+
+    async def update_processed_content(self, article_id, processed_content):
+        return await self._run("update_processed_content", article_id, processed_content)
+
+    async def transition_articles(self, article_ids, state):
+        return await self._run("transition_articles", list(article_ids), state)
+
+    async def approve_article(self, article_id):
+        return await self._run("approve_article", article_id)
+
+    async def approve_articles(self, article_ids):
+        return await self._run("approve_articles", list(article_ids))
+
+    async def reject_articles(self, article_ids):
+        return await self._run("reject_articles", list(article_ids))
+
+    async def reject_pending_by_source(self, source_group):
+        return await self._run("reject_pending_by_source", source_group)
+
+    async def count_pending_by_source(self, source_group):
+        return await self._run("count_pending_by_source", source_group)
+
+    async def mark_as_posted(self, article_id):
+        return await self._run("mark_as_posted", article_id)
+
+    async def get_pending_articles(self, limit=10):
+        return await self._run("get_pending_articles", limit)
+
+    async def get_approved_not_posted_articles(self, limit=5):
+        return await self._run("get_approved_not_posted_articles", limit)
+
+    async def get_article_by_id(self, article_id):
+        return await self._run("get_article_by_id", article_id)
+
+    async def get_articles_page(self, status, limit=5, after_id=None, before_id=None, newest_first=False):
+        return await self._run("get_articles_page", status, limit, after_id, before_id, newest_first)
+
+    async def get_recent_articles(self, limit=1000):
+        return await self._run("get_recent_articles", limit)
+
+    async def archive_old_articles(self, days):
+        return await self._run("archive_old_articles", days)
+
+    async def get_archive_months(self):
+        return await self._run("get_archive_months")
+
+    async def get_archived_articles(self, month):
+        return await self._run("get_archived_articles", month)
+
+    async def get_archived_article(self, article_id):
+        return await self._run("get_archived_article", article_id)
+
+    async def flush(self):
+        return await self._run("flush")
+
+    async def close(self):
+        """Отправка отложенных изменений и остановка пула потоков"""
+        if self.initialized:
+            await self.flush()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,124 @@
+from abc import ABC, abstractmethod
+
+
+class BaseDatabase(ABC):
+    """
+    Интерфейс хранилища новостных статей.
+
+    Состояние статьи меняется только по разрешенным переходам жизненного цикла
+    (bot.lifecycle) с отметкой времени перехода; недопустимые переходы не
+    выполняются. Все реализации возвращают данные в одном формате:
+    - get_pending_articles: список (id, source_group, original_content, processed_content)
+    - get_approved_not_posted_articles: список (id, processed_content)
+    - get_article_by_id: словарь с полями статьи (включая state, state_changed_at
+      и флаги is_approved, is_rejected, is_posted) или None
+    - get_articles_page: ([(id, source_group, processed_content, created_at)], есть ли
+      предыдущая страница, есть ли следующая)
+    """
+
+    @abstractmethod
+    def add_news_article(self, source_group, original_content, source_message_id=None):
+        """Добавление новой статьи, возвращает ID статьи или None"""
+
+    @abstractmethod
+    def update_processed_content(self, article_id, processed_content):
+        """Обновление обработанного контента статьи (ingested -> pending)"""
+
+    @abstractmethod
+    def transition_articles(self, article_ids, state):
+        """
+        Перевод статей в состояние state; статьи, для которых переход
+        не разрешен, не меняются
+
+        Returns:
+            list: ID статей, перешедших в новое состояние
+        """
+
+    @abstractmethod
+    def approve_article(self, article_id):
+        """Одобрение статьи"""
+
+    @abstractmethod
+    def approve_articles(self, article_ids):
+        """
+        Одобрение нескольких ожидающих одобрения статей одной записью
+
+        Статьи, которые тем временем отклонил или одобрил другой администратор,
+        пропускаются: повторное одобрение отклоненной статьи - отдельное действие
+        (approve_article).
+
+        Returns:
+            list: ID статей, которые были одобрены
+        """
+
+    @abstractmethod
+    def reject_articles(self, article_ids):
+        """
+        Отклонение нескольких ожидающих одобрения статей одной записью
+
+        Returns:
+            list: ID статей, которые были отклонены
+        """
+
+    @abstractmethod
+    def reject_pending_by_source(self, source_group):
+        """Отклонение всех ожидающих одобрения статей источника, возвращает их ID"""
+
+    @abstractmethod
+    def count_pending_by_source(self, source_group):
+        """Количество ожидающих одобрения статей источника"""
+
+    @abstractmethod
+    def mark_as_posted(self, article_id):
+        """Отметка статьи как опубликованной (из approved, scheduled или failed)"""
+
+    @abstractmethod
+    def get_pending_articles(self, limit=10):
+        """Получение статей, ожидающих одобрения (новые первыми)"""
+
+    @abstractmethod
+    def get_approved_not_posted_articles(self, limit=5):
+        """Получение одобренных, но не опубликованных статей: approved, scheduled и failed (старые первыми)"""
+
+    @abstractmethod
+    def get_article_by_id(self, article_id):
+        """Получение статьи по ID"""
+
+    @abstractmethod
+    def get_articles_page(self, status, limit=5, after_id=None, before_id=None, newest_first=False):
+        """
+        Страница статей в состоянии status (или в любом из кортежа состояний) по курсору
+
+        Статьи упорядочены по (created_at, id); страница начинается после статьи
+        after_id или заканчивается перед статьей before_id (по умолчанию - первая).
+        """
+
+    @abstractmethod
+    def get_recent_articles(self, limit=1000):
+        """Последние статьи в виде (source_group, source_message_id, original_content), от старых к новым"""
+
+    @abstractmethod
+    def archive_old_articles(self, days):
+        """
+        Перенос опубликованных и отклоненных статей, созданных больше days дней назад,
+        в помесячный архив; активные запросы архив не читают
+
+        Returns:
+            int: число перенесенных статей
+        """
+
+    @abstractmethod
+    def get_archive_months(self):
+        """Месяцы архива в виде "ГГГГ-ММ", от старых к новым"""
+
+    @abstractmethod
+    def get_archived_articles(self, month):
+        """Статьи архива за месяц "ГГГГ-ММ" (словари как в get_article_by_id), от старых к новым"""
+
+    @abstractmethod
+    def get_archived_article(self, article_id):
+        """Статья из архива по ID или None"""
+
+    def flush(self):
+        """Отправка отложенных изменений в хранилище"""
+        return True
@@ -1,20 +1,42 @@
 from ..config import config
+from .async_db import AsyncDatabase
+
+
+def _sqlite_path(database_url):
+    """Путь к файлу базы из DATABASE_URL вида sqlite:///./bot_data.db"""
+    prefix = "sqlite:///"
+    if database_url.startswith(prefix):
+        return database_url[len(prefix):]
+    return database_url
 
-# Импортируем только Google Sheets
-try:
-    from .sheets_database import db as sheets_db
-except ImportError:
-    sheets_db = None
 
 def get_db():
     """
-    Функция возвращает экземпляр базы данных Google Sheets
+    Функция возвращает экземпляр базы данных, выбранной в DATABASE_BACKEND
     """
-    if sheets_db is not None:
+    backend = config.DATABASE_BACKEND.strip().lower()
+
+    if backend == "sqlite":
+        from .sqlite_database import SQLiteDatabase
+        print("Используется SQLite в качестве базы данных")
+        return SQLiteDatabase(_sqlite_path(config.DATABASE_URL))
+
+    if backend == "sheets":
+        try:
+            from .sheets_database import SheetsDatabase
+        except ImportError:
+            raise ImportError("Не удалось импортировать модуль Google Sheets")
         print("Используется Google Sheets в качестве базы данных")
-        return sheets_db
-    else:
-        raise ImportError("Не удалось импортировать модуль Google Sheets")
+        return SheetsDatabase()
+
+    raise ValueError(f"Неизвестное хранилище DATABASE_BACKEND: {config.DATABASE_BACKEND}")
+
+# Асинхронный фасад; само хранилище создается при первом обращении
+async_db = AsyncDatabase(get_db, max_workers=config.DB_MAX_WORKERS)
+
 
-# Экспортируем экземпляр базы данных
-db = get_db() 
\ No newline at end of file
+def __getattr__(name):
+    # Синхронный экземпляр базы данных (db) тоже создается лениво
+    if name == "db":
+        return async_db.database
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
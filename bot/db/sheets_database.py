@@ -1,13 +1,104 @@
 import gspread
-import pandas as pd
+from gspread.utils import ValueInputOption
 from oauth2client.service_account import ServiceAccountCredentials
-from datetime import datetime
+from datetime import datetime, timedelta
+import functools
 import os
+import threading
+import time
 
 from ..config import config
+from ..lifecycle import (
+    APPROVED, FINISHED, INGESTED, PENDING, POSTED, PUBLISHABLE, REJECTED, can_transition, legacy_flags
+)
+from ..metrics import SHEETS_API_ERRORS, SHEETS_API_SECONDS
+from ..stats import stats
+from .article_index import ArticleIndex, ArticleRecord
+from .base import BaseDatabase
+from .write_queue import SheetsWriteQueue
 
-class SheetsDatabase:
-    def __init__(self):
+# Последняя колонка листа статей (для чтения диапазонов строк)
+LAST_COLUMN = chr(ord("A") + len(ArticleRecord.FIELDS) - 1)
+
+class _MeasuredWorksheet:
+    """Обертка листа gspread, замеряющая длительность и ошибки вызовов API"""
+    
+    API_METHODS = {
+        "get", "get_all_values", "row_values", "append_row", "append_rows", "update", "update_cell",
+        "batch_update", "add_cols"
+    }
+    
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+    
+    def __getattr__(self, name):
+        attribute = getattr(self._worksheet, name)
+        if name not in self.API_METHODS:
+            return attribute
+        
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            with SHEETS_API_SECONDS.time(method=name):
+                try:
+                    return attribute(*args, **kwargs)
+                except Exception:
+                    SHEETS_API_ERRORS.inc(method=name)
+                    raise
+        return call
+
+def _synchronized(method):
+    """Сериализация доступа к кэшу и очереди записи из разных потоков"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class SheetsDatabase(BaseDatabase):
+    # Лист активных статей и префикс помесячных листов архива (archive_2024_05)
+    WORKSHEET = "news_articles"
+    ARCHIVE_PREFIX = "archive_"
+    
+    def __init__(self, spreadsheet=None):
+        """
+        Args:
+            spreadsheet: готовая таблица вместо подключения к Google Sheets
+                (локальная замена, например в бенчмарках)
+        """
+        self._lock = threading.RLock()
+        self.client = None
+        self.sheet = spreadsheet
+        self.worksheet = None
+        
+        try:
+            if self.sheet is None:
+                self._connect()
+            self.worksheet = self._get_worksheet(self.WORKSHEET)
+        except Exception as e:
+            print(f"Ошибка при инициализации базы данных Google Sheets: {e}")
+            self.client = None
+            self.sheet = None
+            self.worksheet = None
+        
+        # Локальный кэш таблицы: статьи с корзинами статусов и номера строк по ID
+        self._index = ArticleIndex()
+        self._row_index = {}
+        self._last_row = 1
+        self._cache_loaded_at = 0.0
+        
+        # Листы архива и их строки, загруженные по запросу
+        self._archive_sheets = {}
+        self._archive_rows = {}
+        
+        # Очередь отложенной пакетной записи
+        self._writes = None
+        
+        if self.worksheet:
+            self._writes = SheetsWriteQueue(self.worksheet, config.SHEETS_WRITE_DELAY_SECONDS)
+            self._load_cache()
+    
+    def _connect(self):
+        """Авторизация по учетным данным и открытие (или создание) таблицы"""
         # Путь к файлу с учетными данными
         credentials_path = os.path.join(os.path.dirname(__file__), '..', 'credentials', 'credentials.json')
         
@@ -18,67 +109,162 @@ class SheetsDatabase:
                 "https://www.googleapis.com/auth/drive"]
         
         # Авторизация с помощью учетных данных
+        creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
+        self.client = gspread.authorize(creds)
+        
+        # Получаем или создаем таблицу
         try:
-            creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
-            self.client = gspread.authorize(creds)
-            
-            # Получаем или создаем таблицу
-            try:
-                self.sheet = self.client.open(config.GOOGLE_SHEET_NAME)
-            except gspread.exceptions.SpreadsheetNotFound:
-                # Создаем новую таблицу, если она не существует
-                self.sheet = self.client.create(config.GOOGLE_SHEET_NAME)
-                # Открываем доступ по email из конфига
-                if config.SHARE_EMAIL:
-                    self.sheet.share(config.SHARE_EMAIL, perm_type='user', role='writer')
-            
-            # Проверяем, есть ли лист "news_articles", если нет - создаем
-            try:
-                self.worksheet = self.sheet.worksheet("news_articles")
-            except gspread.exceptions.WorksheetNotFound:
-                self.worksheet = self.sheet.add_worksheet(title="news_articles", rows="1000", cols="9")
-                # Добавляем заголовки
-                headers = [
-                    "id", "source_group", "source_message_id", "original_content",
-                    "processed_content", "is_approved", "is_posted", "created_at", "posted_at"
-                ]
-                self.worksheet.append_row(headers)
-                
-        except Exception as e:
-            print(f"Ошибка при инициализации базы данных Google Sheets: {e}")
-            self.client = None
-            self.sheet = None
-            self.worksheet = None
-            
-    def _get_next_id(self):
-        """Получение следующего ID для новой записи"""
+            self.sheet = self.client.open(config.GOOGLE_SHEET_NAME)
+        except gspread.exceptions.SpreadsheetNotFound:
+            # Создаем новую таблицу, если она не существует
+            self.sheet = self.client.create(config.GOOGLE_SHEET_NAME)
+            # Открываем доступ по email из конфига
+            if config.SHARE_EMAIL:
+                self.sheet.share(config.SHARE_EMAIL, perm_type='user', role='writer')
+    
+    def _get_worksheet(self, title, create=True):
+        """Лист таблицы с колонками статей; если его нет - создается с заголовками (или None)"""
+        try:
+            worksheet = self.sheet.worksheet(title)
+        except gspread.exceptions.WorksheetNotFound:
+            if not create:
+                return None
+            worksheet = self.sheet.add_worksheet(title=title, rows="1000", cols=str(len(ArticleRecord.FIELDS)))
+            # Добавляем заголовки
+            worksheet.append_row(list(ArticleRecord.FIELDS))
+        return _MeasuredWorksheet(worksheet)
+    
+    def _upgrade_header(self, worksheet, header):
+        """Добавление в лист, созданный до колонок state и state_changed_at, недостающих колонок"""
+        if list(header) == list(ArticleRecord.FIELDS):
+            return
+        if worksheet.col_count < len(ArticleRecord.FIELDS):
+            worksheet.add_cols(len(ArticleRecord.FIELDS) - worksheet.col_count)
+        worksheet.update(
+            values=[list(ArticleRecord.FIELDS)], range_name="A1", value_input_option=ValueInputOption.raw
+        )
+    
+    def _load_cache(self):
+        """Полная загрузка таблицы в локальный кэш (один запрос к API)"""
         try:
-            # Получаем все данные из таблицы
             data = self.worksheet.get_all_values()
-            if len(data) <= 1:  # Только заголовки или пусто
-                return 1
-                
-            # Получаем последнюю запись
-            last_id = data[-1][0]  # ID находится в первой колонке
-            if last_id.isdigit():
-                return int(last_id) + 1
-            return 1
+            self._upgrade_header(self.worksheet, data[0] if data else [])
         except Exception as e:
-            print(f"Ошибка при получении следующего ID: {e}")
-            return 1
+            print(f"Ошибка при загрузке кэша таблицы: {e}")
+            return
+        
+        self._index.clear()
+        self._row_index = {}
+        self._last_row = 1
+        self._cache_rows(data[1:], first_row=2)
+        self._cache_loaded_at = time.monotonic()
+        
+        # Начальные счетчики статистики по всей таблице
+        stats.load(
+            (record.state, record.source_group, record.created_at, 1)
+            for record in self._index.records.values()
+        )
+    
+    def _cache_rows(self, rows, first_row):
+        """
+        Добавление строк таблицы в кэш, начиная с номера строки first_row
+
+        Returns:
+            list: добавленные записи
+        """
+        records = []
+        for offset, row in enumerate(rows):
+            row_number = first_row + offset
+            self._last_row = max(self._last_row, row_number)
             
-    def _row_to_dict(self, row):
-        """Преобразование строки таблицы в словарь"""
-        if not row:
-            return None
+            if not row or not str(row[0]).isdigit():
+                continue
             
+            record = ArticleRecord(row)
+            records.append(record)
+            self._row_index[record.id] = row_number
+        
+        self._index.extend(records)
+        return records
+    
+    def _refresh_cache(self):
+        """
+        Инкрементальное обновление кэша по истечении TTL:
+        подтягиваются только строки, добавленные в таблицу после последней загрузки
+        """
+        ttl = config.SHEETS_CACHE_TTL_SECONDS
+        if ttl <= 0 or time.monotonic() - self._cache_loaded_at < ttl:
+            return
+        
         try:
-            headers = self.worksheet.row_values(1)  # Получаем заголовки
-            return dict(zip(headers, row))
+            # Сначала отправляем свои изменения, чтобы номера строк совпадали с таблицей
+            self._writes.flush()
+            new_rows = self.worksheet.get(f"A{self._last_row + 1}:{LAST_COLUMN}")
+            # Строки, добавленные в таблицу извне, тоже учитываются в статистике
+            for record in self._cache_rows(new_rows, first_row=self._last_row + 1):
+                stats.article_added(record.state, record.source_group, record.created_at)
         except Exception as e:
-            print(f"Ошибка при преобразовании строки в словарь: {e}")
-            return None
+            print(f"Ошибка при обновлении кэша таблицы: {e}")
+        finally:
+            self._cache_loaded_at = time.monotonic()
     
+    def _update_cell(self, article_id, field, value):
+        """Постановка изменения ячейки в очередь записи и обновление кэша"""
+        row = self._row_index.get(article_id)
+        if not row:
+            return False
+        
+        if getattr(self._index.get(article_id), field) != value:
+            self._writes.update_cell(row, ArticleRecord.FIELDS.index(field) + 1, value)
+            self._index.update(article_id, field, value)
+        return True
+    
+    def _set_state(self, article_ids, state, from_states=None):
+        """
+        Перевод статей в состояние state по разрешенным переходам
+        
+        Вместе с состоянием записываются время перехода и флаги is_approved/is_posted
+        (а для posted - posted_at); изменения уходят в таблицу с очередью записи.
+        
+        Args:
+            from_states: если задано - меняются только статьи в этих состояниях
+        
+        Returns:
+            list: ID статей, перешедших в новое состояние
+        """
+        changed_at = datetime.utcnow().isoformat()
+        approved, rejected, posted = legacy_flags(state)
+        changed = []
+        for article_id in dict.fromkeys(int(article_id) for article_id in article_ids):
+            record = self._index.get(article_id)
+            if record is None or not can_transition(record.state, state):
+                continue
+            if from_states is not None and record.state not in from_states:
+                continue
+            
+            old_state = record.state
+            self._update_cell(article_id, "state", state)
+            self._update_cell(article_id, "state_changed_at", changed_at)
+            self._update_cell(article_id, "is_approved", "REJECTED" if rejected else "TRUE" if approved else "FALSE")
+            self._update_cell(article_id, "is_posted", "TRUE" if posted else "FALSE")
+            if posted:
+                self._update_cell(article_id, "posted_at", changed_at)
+            stats.status_changed(old_state, state)
+            changed.append(article_id)
+        return changed
+    
+    @_synchronized
+    def flush(self):
+        """Принудительная отправка накопленных изменений в таблицу"""
+        if self._writes is None:
+            return True
+        return self._writes.flush()
+            
+    def _get_next_id(self):
+        """Получение следующего ID для новой записи"""
+        return self._index.max_id() + 1
+    
+    @_synchronized
     def add_news_article(self, source_group, original_content, source_message_id=None):
         """Добавление новой статьи"""
         try:
@@ -86,10 +272,14 @@ class SheetsDatabase:
                 print("Таблица не инициализирована")
                 return None
                 
+            # Подтягиваем строки, добавленные извне, чтобы не выдать занятый ID
+            self._refresh_cache()
+            
             # Получаем следующий ID
             article_id = self._get_next_id()
             
             # Формируем данные для добавления
+            created_at = datetime.utcnow().isoformat()
             row_data = [
                 article_id,                    # id
                 source_group,                  # source_group
@@ -98,189 +288,371 @@ class SheetsDatabase:
                 "",                            # processed_content
                 "FALSE",                       # is_approved
                 "FALSE",                       # is_posted
-                datetime.utcnow().isoformat(), # created_at
-                ""                             # posted_at
+                created_at,                    # created_at
+                "",                            # posted_at
+                INGESTED,                      # state
+                created_at                     # state_changed_at
             ]
             
-            # Добавляем строку в таблицу
-            self.worksheet.append_row([str(item) for item in row_data])
+            # Ставим строку в очередь на добавление и запоминаем ее в кэше
+            row_data = [str(item) for item in row_data]
+            row_number = self._last_row + 1
+            self._writes.append(row_number, row_data)
+            self._cache_rows([row_data], first_row=row_number)
+            stats.article_added(INGESTED, source_group, created_at)
             return article_id
             
         except Exception as e:
             print(f"Ошибка при добавлении статьи: {e}")
             return None
     
+    @_synchronized
     def update_processed_content(self, article_id, processed_content):
         """Обновление обработанного контента статьи"""
         try:
             if not self.worksheet:
                 return False
                 
-            # Находим строку с указанным ID
-            cell = self.worksheet.find(str(article_id), in_column=1)
-            if not cell:
+            # Обновляем содержимое; статья с перефразированным текстом ждет одобрения
+            article_id = int(article_id)
+            if not self._update_cell(article_id, "processed_content", processed_content):
                 return False
-                
-            # Обновляем содержимое (колонка processed_content - 5)
-            self.worksheet.update_cell(cell.row, 5, processed_content)
+            if processed_content:
+                self._set_state([article_id], PENDING, from_states=(INGESTED,))
             return True
             
         except Exception as e:
             print(f"Ошибка при обновлении обработанного контента: {e}")
             return False
             
+    @_synchronized
     def approve_article(self, article_id):
         """Одобрение статьи"""
         try:
             if not self.worksheet:
                 return False
                 
-            # Находим строку с указанным ID
-            cell = self.worksheet.find(str(article_id), in_column=1)
-            if not cell:
-                return False
-                
-            # Обновляем флаг is_approved (колонка 6)
-            self.worksheet.update_cell(cell.row, 6, "TRUE")
-            return True
+            return bool(self._set_state([article_id], APPROVED))
             
         except Exception as e:
             print(f"Ошибка при одобрении статьи: {e}")
             return False
-            
+    
+    @_synchronized
+    def transition_articles(self, article_ids, state):
+        """Перевод статей в новое состояние"""
+        try:
+            if not self.worksheet:
+                return []
+            return self._set_state(article_ids, state)
+        except Exception as e:
+            print(f"Ошибка при смене состояния статей: {e}")
+            return []
+    
+    def _moderate(self, article_ids, state, from_states):
+        """Решение администратора по статьям; изменения уходят в таблицу одним batch_update"""
+        changed = self._set_state(article_ids, state, from_states)
+        if changed:
+            self._writes.flush()
+        return changed
+    
+    @_synchronized
+    def approve_articles(self, article_ids):
+        """Одобрение нескольких ожидающих одобрения статей"""
+        try:
+            if not self.worksheet:
+                return []
+            return self._moderate(article_ids, APPROVED, (PENDING,))
+        except Exception as e:
+            print(f"Ошибка при одобрении статей: {e}")
+            return []
+    
+    @_synchronized
+    def reject_articles(self, article_ids):
+        """Отклонение нескольких ожидающих одобрения статей"""
+        try:
+            if not self.worksheet:
+                return []
+            return self._moderate(article_ids, REJECTED, (PENDING,))
+        except Exception as e:
+            print(f"Ошибка при отклонении статей: {e}")
+            return []
+    
+    @_synchronized
+    def reject_pending_by_source(self, source_group):
+        """Отклонение всех ожидающих одобрения статей источника"""
+        try:
+            if not self.worksheet:
+                return []
+            self._refresh_cache()
+            article_ids = self._index.ids_by_source(PENDING, source_group)
+            return self._moderate(article_ids, REJECTED, (PENDING,))
+        except Exception as e:
+            print(f"Ошибка при отклонении статей источника: {e}")
+            return []
+    
+    @_synchronized
+    def count_pending_by_source(self, source_group):
+        """Количество ожидающих одобрения статей источника"""
+        # Данные берем из локального кэша таблицы
+        self._refresh_cache()
+        return len(self._index.ids_by_source(PENDING, source_group))
+    
+    @_synchronized
     def mark_as_posted(self, article_id):
         """Отметка статьи как опубликованной"""
         try:
             if not self.worksheet:
                 return False
                 
-            # Находим строку с указанным ID
-            cell = self.worksheet.find(str(article_id), in_column=1)
-            if not cell:
-                return False
-                
-            # Обновляем флаг is_posted и posted_at
-            self.worksheet.update_cell(cell.row, 7, "TRUE")  # is_posted
-            self.worksheet.update_cell(cell.row, 9, datetime.utcnow().isoformat())  # posted_at
-            return True
+            # Состояние, флаг is_posted и posted_at уйдут в таблицу одним запросом
+            return bool(self._set_state([article_id], POSTED))
             
         except Exception as e:
             print(f"Ошибка при отметке статьи как опубликованной: {e}")
             return False
             
+    @_synchronized
     def get_pending_articles(self, limit=10):
         """Получение статей, ожидающих одобрения"""
         try:
             if not self.worksheet:
                 return []
                 
-            # Получаем все данные из таблицы
-            all_data = self.worksheet.get_all_values()
-            if len(all_data) <= 1:  # Только заголовки
-                return []
-                
-            # Создаем DataFrame для удобной фильтрации
-            df = pd.DataFrame(all_data[1:], columns=all_data[0])
-            
-            # Фильтруем записи с is_approved=FALSE и непустым processed_content
-            pending_df = df[
-                (df['is_approved'] == "FALSE") & 
-                (df['processed_content'] != "")
+            # Данные берем из локального кэша таблицы: перефразированные, но не одобренные
+            # статьи, от новых к старым
+            self._refresh_cache()
+            return [
+                (record.id, record.source_group, record.original_content, record.processed_content)
+                for record in self._index.newest(PENDING, limit)
             ]
             
-            # Сортируем по дате создания (по убыванию)
-            pending_df = pending_df.sort_values(by='created_at', ascending=False)
-            
-            # Ограничиваем количество результатов
-            pending_df = pending_df.head(limit)
-            
-            # Формируем результат
-            result = []
-            for _, row in pending_df.iterrows():
-                result.append((
-                    int(row['id']),
-                    row['source_group'],
-                    row['original_content'],
-                    row['processed_content']
-                ))
-            
-            return result
-            
         except Exception as e:
             print(f"Ошибка при получении статей, ожидающих одобрения: {e}")
             return []
             
+    @_synchronized
     def get_approved_not_posted_articles(self, limit=5):
         """Получение одобренных, но не опубликованных статей"""
         try:
             if not self.worksheet:
                 return []
                 
-            # Получаем все данные из таблицы
-            all_data = self.worksheet.get_all_values()
-            if len(all_data) <= 1:  # Только заголовки
-                return []
-                
-            # Создаем DataFrame для удобной фильтрации
-            df = pd.DataFrame(all_data[1:], columns=all_data[0])
-            
-            # Фильтруем записи с is_approved=TRUE и is_posted=FALSE
-            approved_df = df[
-                (df['is_approved'] == "TRUE") & 
-                (df['is_posted'] == "FALSE")
-            ]
-            
-            # Сортируем по дате создания (по возрастанию)
-            approved_df = approved_df.sort_values(by='created_at', ascending=True)
-            
-            # Ограничиваем количество результатов
-            approved_df = approved_df.head(limit)
-            
-            # Формируем результат
-            result = []
-            for _, row in approved_df.iterrows():
-                result.append((
-                    int(row['id']),
-                    row['processed_content']
-                ))
-            
-            return result
+            # Данные берем из локального кэша таблицы: одобренные, но не опубликованные
+            # статьи, от старых к новым
+            self._refresh_cache()
+            return [(record.id, record.processed_content) for record in self._index.oldest(PUBLISHABLE, limit)]
             
         except Exception as e:
             print(f"Ошибка при получении одобренных, но не опубликованных статей: {e}")
             return []
             
+    @_synchronized
     def get_article_by_id(self, article_id):
         """Получение статьи по ID"""
         try:
             if not self.worksheet:
                 return None
                 
-            # Находим строку с указанным ID
-            cell = self.worksheet.find(str(article_id), in_column=1)
-            if not cell:
+            # Строка берется из кэша, без обращения к API
+            self._refresh_cache()
+            record = self._index.get(int(article_id))
+            if record is None:
                 return None
                 
-            # Получаем всю строку
-            row_data = self.worksheet.row_values(cell.row)
-            
-            # Формируем результат
-            headers = self.worksheet.row_values(1)
-            article = dict(zip(headers, row_data))
-            
-            return {
-                "id": int(article.get("id", 0)),
-                "source_group": article.get("source_group", ""),
-                "original_content": article.get("original_content", ""),
-                "processed_content": article.get("processed_content", ""),
-                "is_approved": article.get("is_approved", "FALSE") == "TRUE",
-                "is_posted": article.get("is_posted", "FALSE") == "TRUE",
-                "created_at": article.get("created_at", "")
-            }
+            return self._article(record)
             
         except Exception as e:
             print(f"Ошибка при получении статьи по ID: {e}")
             return None
-
-# Создание экземпляра базы данных
-db = SheetsDatabase() 
\ No newline at end of file
+    
+    @staticmethod
+    def _article(record):
+        is_approved, is_rejected, is_posted = legacy_flags(record.state)
+        return {
+            "id": record.id,
+            "source_group": record.source_group,
+            "original_content": record.original_content,
+            "processed_content": record.processed_content,
+            "is_approved": is_approved,
+            "is_rejected": is_rejected,
+            "is_posted": is_posted,
+            "state": record.state,
+            "state_changed_at": record.state_changed_at,
+            "created_at": record.created_at
+        }
+    
+    @_synchronized
+    def get_articles_page(self, status, limit=5, after_id=None, before_id=None, newest_first=False):
+        """Страница статей по курсору из отсортированных корзин состояний"""
+        try:
+            if not self.worksheet:
+                return [], False, False
+                
+            self._refresh_cache()
+            
+            # Курсор - ключ (created_at, id) статьи; удаленная статья сбрасывает курсор
+            after = self._index.get(int(after_id)).sort_key if after_id in self._index else None
+            before = self._index.get(int(before_id)).sort_key if before_id in self._index else None
+            
+            records, has_prev, has_next = self._index.page(status, limit, after, before, newest_first)
+            rows = [
+                (record.id, record.source_group, record.processed_content, record.created_at)
+                for record in records
+            ]
+            return rows, has_prev, has_next
+            
+        except Exception as e:
+            print(f"Ошибка при получении страницы статей: {e}")
+            return [], False, False
+    
+    @_synchronized
+    def get_recent_articles(self, limit=1000):
+        """Получение последних статей для построения индекса дубликатов"""
+        # Данные берем из локального кэша таблицы
+        self._refresh_cache()
+        return [
+            (record.source_group, record.source_message_id, record.original_content)
+            for record in self._index.recent(limit)
+        ]
+    
+    def _archive_title(self, month):
+        """Название листа архива за месяц ГГГГ-ММ"""
+        return self.ARCHIVE_PREFIX + month.replace("-", "_")
+    
+    def _archive_sheet(self, title, create=False):
+        worksheet = self._archive_sheets.get(title)
+        if worksheet is None:
+            worksheet = self._get_worksheet(title, create=create)
+            if worksheet is not None:
+                # Лист архива, созданный до колонок state и state_changed_at
+                self._upgrade_header(worksheet, worksheet.row_values(1))
+                self._archive_sheets[title] = worksheet
+        return worksheet
+    
+    def _archive_records(self, title):
+        """Статьи листа архива (лист читается один раз и дальше берется из памяти)"""
+        records = self._archive_rows.get(title)
+        if records is None:
+            worksheet = self._archive_sheet(title)
+            if worksheet is None:
+                return []
+            rows = worksheet.get_all_values()[1:]
+            records = [ArticleRecord(row) for row in rows if row and str(row[0]).isdigit()]
+            self._archive_rows[title] = records
+        return records
+    
+    @_synchronized
+    def archive_old_articles(self, days):
+        """
+        Перенос старых опубликованных и отклоненных статей в листы archive_ГГГГ_ММ
+        
+        Лист news_articles перечитывается непосредственно перед переносом, чтобы
+        не затереть правки, сделанные в таблице вручную. Строки дописываются в
+        листы архива по месяцу создания (статьи, уже попавшие в архив при
+        прерванном запуске, повторно не дописываются), после чего лист
+        news_articles одним запросом перезаписывается оставшимися статьями (хвост
+        заполняется пустыми строками), так что загрузка при запуске читает только
+        активные статьи.
+        """
+        if not self.worksheet:
+            return 0
+        
+        try:
+            # Отправляем свои изменения и берем строки в том виде, в каком они
+            # сейчас в таблице, а не из кэша
+            if not self._writes.flush():
+                return 0
+            data = self.worksheet.get_all_values()
+            last_row = max(len(data), self._last_row)
+            records = [ArticleRecord(row) for row in data[1:] if row and str(row[0]).isdigit()]
+            if not records:
+                return 0
+            
+            cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+            # Статья с наибольшим ID остается в листе: по ней выдается следующий ID
+            newest_id = max(record.id for record in records)
+            archived = [
+                record for record in records
+                if record.state in FINISHED and record.created_at < cutoff and record.id != newest_id
+            ]
+            if not archived:
+                return 0
+            
+            by_month = {}
+            for record in sorted(archived, key=lambda record: record.id):
+                by_month.setdefault(self._archive_title(record.created_at[:7]), []).append(record)
+            for title, month_records in by_month.items():
+                worksheet = self._archive_sheet(title, create=True)
+                archived_ids = {record.id for record in self._archive_records(title)}
+                new_records = [record for record in month_records if record.id not in archived_ids]
+                if not new_records:
+                    continue
+                worksheet.append_rows(
+                    [record.row() for record in new_records], value_input_option=ValueInputOption.raw
+                )
+                self._archive_rows[title].extend(new_records)
+            
+            archived_ids = {record.id for record in archived}
+            remaining = [record for record in records if record.id not in archived_ids]
+            values = [list(ArticleRecord.FIELDS)] + [record.row() for record in remaining]
+            blank = [""] * len(ArticleRecord.FIELDS)
+            values += [blank] * (last_row - len(values))
+            self.worksheet.update(values=values, range_name="A1", value_input_option=ValueInputOption.raw)
+        except Exception as e:
+            print(f"Ошибка при архивировании статей: {e}")
+            return 0
+        
+        self._index.clear()
+        self._row_index = {}
+        self._last_row = 1
+        self._cache_rows([record.row() for record in remaining], first_row=2)
+        self._cache_loaded_at = time.monotonic()
+        # Счетчики пересчитываются по прочитанным строкам: они могли измениться вручную
+        stats.load(
+            (record.state, record.source_group, record.created_at, 1)
+            for record in self._index.records.values()
+        )
+        return len(archived)
+    
+    @_synchronized
+    def get_archive_months(self):
+        """Месяцы по листам архива в таблице"""
+        if not self.sheet:
+            return []
+        try:
+            titles = [worksheet.title for worksheet in self.sheet.worksheets()]
+        except Exception as e:
+            print(f"Ошибка при получении листов архива: {e}")
+            return []
+        return sorted(
+            title[len(self.ARCHIVE_PREFIX):].replace("_", "-")
+            for title in titles if title.startswith(self.ARCHIVE_PREFIX)
+        )
+    
+    @_synchronized
+    def get_archived_articles(self, month):
+        """Статьи листа архива за месяц"""
+        if not self.sheet:
+            return []
+        try:
+            records = self._archive_records(self._archive_title(month))
+        except Exception as e:
+            print(f"Ошибка при чтении архива: {e}")
+            return []
+        return [self._article(record) for record in sorted(records, key=lambda record: record.sort_key)]
+    
+    @_synchronized
+    def get_archived_article(self, article_id):
+        """Статья из архива по ID (листы архива просматриваются от новых к старым)"""
+        article_id = int(article_id)
+        for month in reversed(self.get_archive_months()):
+            try:
+                records = self._archive_records(self._archive_title(month))
+            except Exception as e:
+                print(f"Ошибка при чтении архива: {e}")
+                return None
+            for record in records:
+                if record.id == article_id:
+                    return self._article(record)
+        return None
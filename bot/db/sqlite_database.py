@@ -0,0 +1,434 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from ..lifecycle import (
+    APPROVED, INGESTED, PENDING, POSTED, PUBLISHABLE, REJECTED, can_transition, legacy_flags
+)
+from ..stats import stats
+from .base import BaseDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news_articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_group TEXT NOT NULL,
+    source_message_id INTEGER,
+    original_content TEXT NOT NULL,
+    processed_content TEXT NOT NULL DEFAULT '',
+    is_approved INTEGER NOT NULL DEFAULT 0, -- 1 - одобрена, -1 - отклонена
+    is_posted INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    posted_at TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT 'ingested', -- состояние жизненного цикла (bot.lifecycle)
+    state_changed_at TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_news_articles_source
+    ON news_articles (source_group, source_message_id);
+
+-- Опубликованные и отклоненные статьи старше ARCHIVE_AFTER_DAYS дней
+CREATE TABLE IF NOT EXISTS news_articles_archive (
+    id INTEGER PRIMARY KEY,
+    source_group TEXT NOT NULL,
+    source_message_id INTEGER,
+    original_content TEXT NOT NULL,
+    processed_content TEXT NOT NULL DEFAULT '',
+    is_approved INTEGER NOT NULL DEFAULT 0,
+    is_posted INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    posted_at TEXT NOT NULL DEFAULT '',
+    archived_at TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'ingested',
+    state_changed_at TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_news_articles_archive_created
+    ON news_articles_archive (created_at);
+"""
+
+# Колонки состояния для баз, созданных до их появления; state заполняется по флагам
+STATE_MIGRATION = """
+ALTER TABLE {table} ADD COLUMN state TEXT NOT NULL DEFAULT 'ingested';
+ALTER TABLE {table} ADD COLUMN state_changed_at TEXT NOT NULL DEFAULT '';
+UPDATE {table} SET state = CASE
+    WHEN is_posted = 1 THEN 'posted'
+    WHEN is_approved = -1 THEN 'rejected'
+    WHEN is_approved = 1 THEN 'scheduled'
+    WHEN processed_content != '' THEN 'pending'
+    ELSE 'ingested'
+END;
+"""
+
+# Индекс по состоянию: выборки состояния и страницы по (created_at, id) читают только его
+STATE_INDEX = """
+DROP INDEX IF EXISTS idx_news_articles_status;
+CREATE INDEX IF NOT EXISTS idx_news_articles_state
+    ON news_articles (state, created_at);
+"""
+
+# Статьи, которые переносятся в архив (lifecycle.FINISHED, вместе с условием на дату создания)
+ARCHIVE_FILTER = "state IN ('posted', 'rejected') AND created_at < ?"
+
+
+class SQLiteDatabase(BaseDatabase):
+    """Локальное хранилище статей в SQLite (режим WAL)"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Соединение используется из нескольких потоков, доступ сериализуется блокировкой
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.conn.executescript(STATE_INDEX)
+        self._load_stats()
+
+    def _migrate(self):
+        """Добавление колонок состояния в таблицы, созданные старой версией бота"""
+        for table in ("news_articles", "news_articles_archive"):
+            columns = [row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+            if "state" not in columns:
+                self.conn.executescript("BEGIN;" + STATE_MIGRATION.format(table=table) + "COMMIT;")
+
+    def _load_stats(self):
+        """Начальные счетчики статистики одним агрегирующим запросом"""
+        try:
+            rows = self._fetchall(
+                "SELECT state, source_group, substr(created_at, 1, 10), COUNT(*) "
+                "FROM news_articles GROUP BY 1, 2, 3"
+            )
+        except sqlite3.Error as e:
+            print(f"Ошибка при подсчете статистики: {e}")
+            return
+        stats.load(tuple(row) for row in rows)
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            return self.conn.execute(query, params)
+
+    def _fetchall(self, query, params=()):
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def add_news_article(self, source_group, original_content, source_message_id=None):
+        """Добавление новой статьи"""
+        try:
+            created_at = datetime.utcnow().isoformat()
+            cursor = self._execute(
+                "INSERT INTO news_articles (source_group, source_message_id, original_content, created_at, "
+                "state, state_changed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (source_group, source_message_id, original_content, created_at, INGESTED, created_at)
+            )
+            stats.article_added(INGESTED, source_group, created_at)
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            print(f"Ошибка при добавлении статьи: {e}")
+            return None
+
+    def _set_state(self, article_ids, state, from_states=None):
+        """
+        Перевод статей в состояние state по разрешенным переходам одной транзакцией
+
+        Вместе с состоянием записываются время перехода и флаги is_approved/is_posted
+        (а для posted - posted_at).
+
+        Args:
+            from_states: если задано - меняются только статьи в этих состояниях
+
+        Returns:
+            list: ID статей, перешедших в новое состояние
+        """
+        article_ids = list(dict.fromkeys(int(article_id) for article_id in article_ids))
+        if not article_ids:
+            return []
+
+        changed_at = datetime.utcnow().isoformat()
+        approved, rejected, posted = legacy_flags(state)
+        try:
+            with self._lock:
+                placeholders = ", ".join("?" * len(article_ids))
+                old_states = dict(self._fetchall(
+                    f"SELECT id, state FROM news_articles WHERE id IN ({placeholders})", article_ids
+                ))
+                changed = [
+                    article_id for article_id in article_ids
+                    if can_transition(old_states.get(article_id), state)
+                    and (from_states is None or old_states[article_id] in from_states)
+                ]
+                if not changed:
+                    return []
+
+                self.conn.execute("BEGIN")
+                try:
+                    self.conn.execute(
+                        "UPDATE news_articles SET state = ?, state_changed_at = ?, is_approved = ?, "
+                        "is_posted = ?, posted_at = CASE WHEN ? THEN ? ELSE posted_at END "
+                        f"WHERE id IN ({', '.join('?' * len(changed))})",
+                        (state, changed_at, -1 if rejected else int(approved), int(posted),
+                         posted, changed_at, *changed)
+                    )
+                    self.conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self.conn.execute("ROLLBACK")
+                    raise
+
+                for article_id in changed:
+                    stats.status_changed(old_states[article_id], state)
+                return changed
+        except sqlite3.Error as e:
+            print(f"Ошибка при смене состояния статей: {e}")
+            return []
+
+    def update_processed_content(self, article_id, processed_content):
+        """Обновление обработанного контента статьи"""
+        try:
+            with self._lock:
+                if not self._execute(
+                    "UPDATE news_articles SET processed_content = ? WHERE id = ?",
+                    (processed_content, int(article_id))
+                ).rowcount:
+                    return False
+        except sqlite3.Error as e:
+            print(f"Ошибка при обновлении статьи: {e}")
+            return False
+        # Статья с перефразированным текстом ждет одобрения
+        if processed_content:
+            self._set_state([article_id], PENDING, from_states=(INGESTED,))
+        return True
+
+    def transition_articles(self, article_ids, state):
+        """Перевод статей в новое состояние"""
+        return self._set_state(article_ids, state)
+
+    def approve_article(self, article_id):
+        """Одобрение статьи"""
+        return bool(self._set_state([article_id], APPROVED))
+
+    def approve_articles(self, article_ids):
+        """Одобрение нескольких ожидающих одобрения статей"""
+        return self._set_state(article_ids, APPROVED, from_states=(PENDING,))
+
+    def reject_articles(self, article_ids):
+        """Отклонение нескольких ожидающих одобрения статей"""
+        return self._set_state(article_ids, REJECTED, from_states=(PENDING,))
+
+    def reject_pending_by_source(self, source_group):
+        """Отклонение всех ожидающих одобрения статей источника"""
+        try:
+            rows = self._fetchall(
+                "SELECT id FROM news_articles WHERE source_group = ? AND state = ?",
+                (source_group, PENDING)
+            )
+        except sqlite3.Error as e:
+            print(f"Ошибка при отклонении статей источника: {e}")
+            return []
+        return self.reject_articles([row[0] for row in rows])
+
+    def count_pending_by_source(self, source_group):
+        """Количество ожидающих одобрения статей источника"""
+        try:
+            rows = self._fetchall(
+                "SELECT COUNT(*) FROM news_articles WHERE source_group = ? AND state = ?",
+                (source_group, PENDING)
+            )
+        except sqlite3.Error as e:
+            print(f"Ошибка при подсчете статей источника: {e}")
+            return 0
+        return rows[0][0]
+
+    def mark_as_posted(self, article_id):
+        """Отметка статьи как опубликованной"""
+        return bool(self._set_state([article_id], POSTED))
+
+    def get_pending_articles(self, limit=10):
+        """Получение статей, ожидающих одобрения"""
+        try:
+            rows = self._fetchall(
+                "SELECT id, source_group, original_content, processed_content FROM news_articles "
+                "WHERE state = ? ORDER BY created_at DESC LIMIT ?",
+                (PENDING, limit)
+            )
+            return [tuple(row) for row in rows]
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении статей, ожидающих одобрения: {e}")
+            return []
+
+    def get_approved_not_posted_articles(self, limit=5):
+        """Получение одобренных, но не опубликованных статей"""
+        try:
+            rows = self._fetchall(
+                "SELECT id, processed_content FROM news_articles "
+                f"WHERE state IN ({', '.join('?' * len(PUBLISHABLE))}) "
+                "ORDER BY created_at ASC LIMIT ?",
+                (*PUBLISHABLE, limit)
+            )
+            return [tuple(row) for row in rows]
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении одобренных, но не опубликованных статей: {e}")
+            return []
+
+    def get_article_by_id(self, article_id):
+        """Получение статьи по ID"""
+        try:
+            rows = self._fetchall(
+                "SELECT * FROM news_articles WHERE id = ?", (int(article_id),)
+            )
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении статьи по ID: {e}")
+            return None
+
+        if not rows:
+            return None
+
+        return self._article(rows[0])
+
+    @staticmethod
+    def _article(row):
+        is_approved, is_rejected, is_posted = legacy_flags(row["state"])
+        return {
+            "id": row["id"],
+            "source_group": row["source_group"],
+            "original_content": row["original_content"],
+            "processed_content": row["processed_content"],
+            "is_approved": is_approved,
+            "is_rejected": is_rejected,
+            "is_posted": is_posted,
+            "state": row["state"],
+            "state_changed_at": row["state_changed_at"],
+            "created_at": row["created_at"]
+        }
+
+    def get_articles_page(self, status, limit=5, after_id=None, before_id=None, newest_first=False):
+        """
+        Страница статей по курсору (keyset-пагинация по индексу состояния)
+
+        Индекс (state, created_at) неявно содержит id, поэтому условие
+        (created_at, id) > (?, ?) и сортировка не требуют просмотра таблицы.
+        Для нескольких состояний строки из частей индекса досортировываются
+        (это одобренные статьи - их немного).
+        """
+        backward = before_id is not None
+        cursor_id = before_id if backward else after_id
+        # Направление чтения индекса: для страницы назад - обратное порядку показа
+        ascending = newest_first == backward
+        order = "ASC" if ascending else "DESC"
+
+        try:
+            states = (status,) if isinstance(status, str) else tuple(status)
+            where = f"state IN ({', '.join('?' * len(states))})"
+            params = list(states)
+            key = None
+            if cursor_id is not None:
+                key = self._fetchall(
+                    "SELECT created_at, id FROM news_articles WHERE id = ?", (int(cursor_id),)
+                )
+            if key:
+                where += f" AND (created_at, id) {'>' if ascending else '<'} (?, ?)"
+                params.extend(key[0])
+
+            rows = self._fetchall(
+                "SELECT id, source_group, processed_content, created_at FROM news_articles "
+                f"WHERE {where} ORDER BY created_at {order}, id {order} LIMIT ?",
+                (*params, limit + 1)
+            )
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении страницы статей: {e}")
+            return [], False, False
+
+        # Лишняя запись показывает, есть ли еще страница в направлении чтения
+        more = len(rows) > limit
+        rows = [tuple(row) for row in rows[:limit]]
+        if backward:
+            rows.reverse()
+            return rows, more, bool(key)
+        return rows, bool(key), more
+
+    def get_recent_articles(self, limit=1000):
+        """Получение последних статей для построения индекса дубликатов"""
+        try:
+            rows = self._fetchall(
+                "SELECT source_group, source_message_id, original_content FROM news_articles "
+                "ORDER BY id DESC LIMIT ?",
+                (limit,)
+            )
+            return [tuple(row) for row in reversed(rows)]
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении последних статей: {e}")
+            return []
+
+    def archive_old_articles(self, days):
+        """Перенос старых опубликованных и отклоненных статей в news_articles_archive"""
+        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+        try:
+            with self._lock:
+                counts = self._fetchall(
+                    "SELECT state, source_group, substr(created_at, 1, 10), COUNT(*) "
+                    f"FROM news_articles WHERE {ARCHIVE_FILTER} GROUP BY 1, 2, 3",
+                    (cutoff,)
+                )
+                if not counts:
+                    return 0
+
+                self.conn.execute("BEGIN")
+                try:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO news_articles_archive "
+                        "SELECT id, source_group, source_message_id, original_content, processed_content, "
+                        "is_approved, is_posted, created_at, posted_at, ?, state, state_changed_at "
+                        f"FROM news_articles WHERE {ARCHIVE_FILTER}",
+                        (datetime.utcnow().isoformat(), cutoff)
+                    )
+                    archived = self.conn.execute(
+                        f"DELETE FROM news_articles WHERE {ARCHIVE_FILTER}", (cutoff,)
+                    ).rowcount
+                    self.conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self.conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            print(f"Ошибка при архивировании статей: {e}")
+            return 0
+
+        stats.articles_archived(tuple(row) for row in counts)
+        return archived
+
+    def get_archive_months(self):
+        """Месяцы, за которые в архиве есть статьи"""
+        try:
+            rows = self._fetchall(
+                "SELECT DISTINCT substr(created_at, 1, 7) FROM news_articles_archive ORDER BY 1"
+            )
+            return [row[0] for row in rows]
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении месяцев архива: {e}")
+            return []
+
+    def get_archived_articles(self, month):
+        """Статьи архива за месяц (по индексу даты создания)"""
+        start = datetime.strptime(month, "%Y-%m")
+        end = (start + timedelta(days=32)).strftime("%Y-%m")
+        try:
+            rows = self._fetchall(
+                "SELECT * FROM news_articles_archive WHERE created_at >= ? AND created_at < ? "
+                "ORDER BY created_at, id",
+                (month, end)
+            )
+            return [self._article(row) for row in rows]
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении статей архива: {e}")
+            return []
+
+    def get_archived_article(self, article_id):
+        """Статья из архива по ID"""
+        try:
+            rows = self._fetchall(
+                "SELECT * FROM news_articles_archive WHERE id = ?", (int(article_id),)
+            )
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении статьи из архива: {e}")
+            return None
+        return self._article(rows[0]) if rows else None
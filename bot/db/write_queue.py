@@ -0,0 +1,99 @@
+import threading
+
+from gspread.utils import rowcol_to_a1, ValueInputOption
+
+
+class SheetsWriteQueue:
+    """
+    Очередь отложенной записи в Google Sheets.
+
+    Копит добавления строк и изменения ячеек в течение короткого окна,
+    после чего отправляет их одним вызовом append_rows и одним batch_update.
+    Повторные изменения одной и той же ячейки схлопываются, а изменения
+    строк, которые еще не добавлены в таблицу, вносятся прямо в добавляемую строку.
+    """
+
+    def __init__(self, worksheet, delay, max_batch=500):
+        self.worksheet = worksheet
+        self.delay = delay
+        self.max_batch = max_batch
+
+        self._lock = threading.RLock()
+        self._timer = None
+        # Строки, ожидающие добавления: номер строки -> значения
+        self._appends = {}
+        # Изменения ячеек: (строка, колонка) -> значение
+        self._cells = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._appends) + len(self._cells)
+
+    def append(self, row_number, row):
+        """Постановка строки в очередь на добавление"""
+        with self._lock:
+            self._appends[row_number] = list(row)
+            self._schedule()
+
+    def update_cell(self, row_number, column, value):
+        """Постановка изменения ячейки в очередь"""
+        with self._lock:
+            pending_row = self._appends.get(row_number)
+            if pending_row is not None:
+                # Строка еще не отправлена - меняем значение прямо в ней
+                pending_row[column - 1] = value
+            else:
+                self._cells[(row_number, column)] = value
+            self._schedule()
+
+    def _schedule(self):
+        """Планирование сброса очереди по истечении окна"""
+        if self.delay <= 0 or len(self._appends) + len(self._cells) >= self.max_batch:
+            self.flush()
+            return
+
+        self._start_timer()
+
+    def _start_timer(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Отправка накопленных изменений в таблицу"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            appends, self._appends = self._appends, {}
+            cells, self._cells = self._cells, {}
+
+            try:
+                if appends:
+                    rows = [appends[row_number] for row_number in sorted(appends)]
+                    self.worksheet.append_rows(rows, value_input_option=ValueInputOption.raw)
+                    appends = {}
+
+                if cells:
+                    self.worksheet.batch_update(
+                        [
+                            {"range": rowcol_to_a1(row, column), "values": [[value]]}
+                            for (row, column), value in sorted(cells.items())
+                        ],
+                        value_input_option=ValueInputOption.user_entered,
+                    )
+                return True
+
+            except Exception as e:
+                print(f"Ошибка при записи изменений в таблицу: {e}")
+                # Возвращаем неотправленные изменения в очередь, не затирая более новые
+                for row_number, row in appends.items():
+                    self._appends.setdefault(row_number, row)
+                for key, value in cells.items():
+                    self._cells.setdefault(key, value)
+                # Повторная попытка при следующем окне
+                if self.delay > 0:
+                    self._start_timer()
+                return False
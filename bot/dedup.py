@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict, defaultdict
+from loguru import logger
+
+# Разрядность SimHash и разбиение на полосы для поиска похожих отпечатков
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Счетчики бит SimHash упакованы в одно большое целое по 16 бит на позицию:
+# так вклад признака добавляется одним сложением вместо цикла по 64 битам
+_LANE_BITS = 16
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_BYTE_LANES = [
+    [
+        sum((byte >> bit & 1) << ((position * 8 + bit) * _LANE_BITS) for bit in range(8))
+        for byte in range(256)
+    ]
+    for position in range(SIMHASH_BITS // 8)
+]
+
+# Строка, встреченная в стольких разных сообщениях, считается шаблонной (подпись
+# канала, призыв подписаться) и не участвует в SimHash
+BOILERPLATE_MIN_COUNT = 3
+
+# Версия формата отпечатков в файле индекса: при смене алгоритма индекс строится заново
+INDEX_VERSION = 2
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+|t\.me/\S+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """Нормализация текста: нижний регистр, без ссылок, пунктуации и лишних пробелов"""
+    text = _URL_RE.sub(" ", text.lower())
+    return " ".join(_WORD_RE.findall(text))
+
+
+def text_lines(text):
+    """Нормализованные непустые строки текста"""
+    lines = (normalize_text(line) for line in text.splitlines())
+    return [line for line in lines if line]
+
+
+def content_hash(normalized):
+    """Точный отпечаток нормализованного текста"""
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def simhash(normalized):
+    """SimHash по словам текста: у почти одинаковых текстов отличается мало бит"""
+    features = set(normalized.split())
+
+    lanes = 0
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        for position, byte in enumerate(digest):
+            lanes += _BYTE_LANES[position][byte]
+
+    # Бит выставляется, если его имеет больше половины признаков
+    result = 0
+    for bit in range(SIMHASH_BITS):
+        if (lanes >> (bit * _LANE_BITS) & _LANE_MASK) * 2 > len(features):
+            result |= 1 << bit
+    return result
+
+
+def _bands(value):
+    return [(band, value >> (band * BAND_BITS) & BAND_MASK) for band in range(SIMHASH_BANDS)]
+
+
+class DedupIndex:
+    """
+    Индекс дубликатов для входящих сообщений.
+
+    Хранит два ограниченных по размеру индекса:
+    - точный: пары (source_group, source_message_id);
+    - по содержимому: хэш нормализованного текста и SimHash для поиска
+      почти одинаковых текстов (репостов с мелкими правками).
+
+    Похожие SimHash ищутся через разбиение на полосы: при расстоянии Хэмминга
+    меньше числа полос хотя бы одна полоса совпадает целиком. Строки, которые
+    повторяются во многих сообщениях (подписи каналов), в SimHash не входят,
+    иначе короткие разные новости с одной подписью считаются похожими. Индекс
+    сохраняется в JSON-файл, чтобы при старте не пересчитывать отпечатки.
+    """
+
+    def __init__(self, path=None, max_entries=10000, max_distance=3):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = min(max_distance, SIMHASH_BANDS - 1)
+
+        self._sources = OrderedDict()
+        # Точный хэш -> SimHash, в порядке добавления
+        self._content = OrderedDict()
+        # (номер полосы, значение) -> множество точных хэшей
+        self._band_index = defaultdict(set)
+        # Хэш строки -> в скольких сообщениях она встречалась (для поиска подписей)
+        self._lines = OrderedDict()
+
+    def __len__(self):
+        return len(self._content)
+
+    def seen_source(self, source_group, message_id):
+        """Было ли сообщение с таким ID из этой группы"""
+        return (source_group, int(message_id)) in self._sources
+
+    def find_duplicate(self, text):
+        """
+        Поиск дубликата текста в индексе
+
+        Returns:
+            str: "exact" или "near", если найден дубликат, иначе None
+        """
+        exact = content_hash(normalize_text(text))
+        if exact in self._content:
+            return "exact"
+
+        fingerprint = simhash(self._significant_text(text))
+        for band in _bands(fingerprint):
+            for candidate in self._band_index.get(band, ()):
+                if bin(self._content[candidate] ^ fingerprint).count("1") <= self.max_distance:
+                    return "near"
+        return None
+
+    def _significant_text(self, text):
+        """Текст без шаблонных строк (если шаблонные все строки - текст целиком)"""
+        lines = text_lines(text)
+        significant = [
+            line for line in lines
+            if self._lines.get(content_hash(line), 0) < BOILERPLATE_MIN_COUNT
+        ]
+        return " ".join(significant or lines)
+
+    def _count_lines(self, text):
+        for key in {content_hash(line) for line in text_lines(text)}:
+            self._lines[key] = self._lines.get(key, 0) + 1
+            self._lines.move_to_end(key)
+        while len(self._lines) > self.max_entries:
+            self._lines.popitem(last=False)
+
+    def add(self, source_group, message_id, text):
+        """Добавление сообщения в индекс"""
+        if message_id is not None:
+            self._add_source((source_group, int(message_id)))
+
+        self._add_text(text)
+
+    def _add_text(self, text):
+        self._add_content(content_hash(normalize_text(text)), simhash(self._significant_text(text)))
+        self._count_lines(text)
+
+    def discard(self, source_group, message_id, text):
+        """
+        Удаление сообщения из индекса: сообщение не удалось сохранить, и его
+        повтор или репост не должен отсеиваться как дубликат
+        """
+        if message_id is not None:
+            self._sources.pop((source_group, int(message_id)), None)
+
+        exact = content_hash(normalize_text(text))
+        fingerprint = self._content.pop(exact, None)
+        if fingerprint is not None:
+            self._remove_bands(exact, fingerprint)
+
+    def _add_source(self, key):
+        self._sources[key] = None
+        self._sources.move_to_end(key)
+        while len(self._sources) > self.max_entries:
+            self._sources.popitem(last=False)
+
+    def _add_content(self, exact, fingerprint):
+        if exact in self._content:
+            self._content.move_to_end(exact)
+            return
+
+        self._content[exact] = fingerprint
+        for band in _bands(fingerprint):
+            self._band_index[band].add(exact)
+
+        while len(self._content) > self.max_entries:
+            self._remove_bands(*self._content.popitem(last=False))
+
+    def _remove_bands(self, exact, fingerprint):
+        for band in _bands(fingerprint):
+            bucket = self._band_index.get(band)
+            if bucket is not None:
+                bucket.discard(exact)
+                if not bucket:
+                    del self._band_index[band]
+
+    def rebuild(self, articles):
+        """
+        Построение индекса по статьям из базы данных
+
+        Args:
+            articles: список (source_group, source_message_id, original_content), от старых к новым
+        """
+        for source_group, message_id, text in articles:
+            if message_id not in (None, ""):
+                self._add_source((source_group, int(message_id)))
+            self._add_text(text or "")
+
+    def load(self):
+        """Загрузка индекса из файла, возвращает False, если файла нет или он старого формата"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось прочитать индекс дубликатов {self.path}: {e}")
+            return False
+
+        if data.get("version") != INDEX_VERSION:
+            logger.info("Индекс дубликатов сохранен в старом формате и будет построен заново")
+            return False
+
+        for source_group, message_id in data.get("sources", []):
+            self._add_source((source_group, message_id))
+        for exact, fingerprint in data.get("content", []):
+            self._add_content(exact, fingerprint)
+        for key, count in data.get("lines", []):
+            self._lines[key] = count
+        return True
+
+    def save(self):
+        """Сохранение индекса в файл"""
+        if not self.path:
+            return
+
+        data = {
+            "version": INDEX_VERSION,
+            "sources": [list(key) for key in self._sources],
+            "content": [[exact, fingerprint] for exact, fingerprint in self._content.items()],
+            "lines": [[key, count] for key, count in self._lines.items()],
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить индекс дубликатов {self.path}: {e}")
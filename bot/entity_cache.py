@@ -0,0 +1,73 @@
+from loguru import logger
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+
+from .json_store import JsonStore
+
+
+def _serialize_peer(peer):
+    if isinstance(peer, InputPeerChannel):
+        return {"type": "channel", "id": peer.channel_id, "access_hash": peer.access_hash}
+    if isinstance(peer, InputPeerChat):
+        return {"type": "chat", "id": peer.chat_id}
+    if isinstance(peer, InputPeerUser):
+        return {"type": "user", "id": peer.user_id, "access_hash": peer.access_hash}
+    return None
+
+
+def _deserialize_peer(data):
+    peer_type = data.get("type")
+    if peer_type == "channel":
+        return InputPeerChannel(data["id"], data["access_hash"])
+    if peer_type == "chat":
+        return InputPeerChat(data["id"])
+    if peer_type == "user":
+        return InputPeerUser(data["id"], data["access_hash"])
+    return None
+
+
+class EntityCache:
+    """
+    Кэш входных пиров для групп-источников.
+
+    Каждая группа (например, @group_name) разрешается один раз, а ее
+    InputPeer (id + access_hash) сохраняется в JSON-файл и переиспользуется
+    между циклами парсинга и перезапусками. Повторное разрешение имени
+    выполняется только после invalidate(), когда запрос с сохраненным пиром не удался.
+    """
+
+    def __init__(self, client, path):
+        self.client = client
+        self.store = JsonStore(path)
+        self._peers = {}
+
+    async def get(self, group):
+        """Получение InputPeer группы: из памяти, с диска или через Telegram"""
+        peer = self._peers.get(group)
+        if peer is not None:
+            return peer
+
+        data = self.store.get(group)
+        if data:
+            peer = _deserialize_peer(data)
+            if peer is not None:
+                self._peers[group] = peer
+                return peer
+
+        return await self.resolve(group)
+
+    async def resolve(self, group):
+        """Разрешение имени группы через Telegram и сохранение результата"""
+        peer = await self.client.get_input_entity(group)
+        self._peers[group] = peer
+
+        data = _serialize_peer(peer)
+        if data is not None:
+            self.store.set(group, data)
+        logger.info(f"Группа {group} разрешена и сохранена в кэш")
+        return peer
+
+    def invalidate(self, group):
+        """Удаление группы из кэша (например, если изменился access_hash)"""
+        self._peers.pop(group, None)
+        if self.store.get(group) is not None:
+            self.store.pop(group)
@@ -1,21 +1,103 @@
-import google.generativeai as genai
+import asyncio
+import json
+import os
+import re
+import threading
 from loguru import logger
 from .config import config
+from .llm_scheduler import LLMScheduler, estimate_tokens
+from .metrics import GEMINI_ERRORS, GEMINI_REQUEST_SECONDS
+from .rewrite_cache import RewriteCache, rewrite_key
+
+# Версия шаблона промпта: при изменении инструкции нужно увеличить,
+# чтобы не использовать закэшированные ответы на старый промпт
+PROMPT_VERSION = "1"
+
+# Инструкция для пакетного режима: те же требования к тексту, что и в одиночном,
+# поэтому результаты обоих режимов хранятся в кэше под одной версией промпта
+BATCH_PROMPT = """
+Ниже приведен JSON-массив новостей вида [{{"id": число, "text": "текст"}}]. Каждую новость нужно перефразировать для публикации в телеграм-канале о Турции (регион Алания и Газипаша).
+Сохрани всю важную информацию, но измени формулировки, чтобы избежать проблем с авторским правом.
+Текст должен быть легко читаемым, с хорошим форматированием для Telegram.
+Добавь эмодзи для улучшения восприятия.
+Не добавляй от себя фактов, которых нет в исходном тексте.
+Новости обрабатывай независимо друг от друга.
+
+Ответь только JSON-массивом вида [{{"id": число, "text": "перефразированный текст"}}] с теми же id, без пояснений.
+
+Новости:
+{items}
+"""
+
+_JSON_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
 
 class GeminiHelper:
+    """
+    Перефразирование новостей через Gemini.
+
+    Модель (вместе с импортом google.generativeai) и кэш перефразирования
+    создаются при первом обращении или в warm_up() при запуске бота, поэтому
+    импорт модуля не требует ключа API и не создает файлов.
+    """
+    
     def __init__(self):
         self.api_key = config.GEMINI_API_KEY
-        if not self.api_key:
-            logger.error("GEMINI_API_KEY не задан в .env файле")
-            raise ValueError("GEMINI_API_KEY не задан")
+        self._model = None
+        self._cache = None
+        self._init_lock = threading.Lock()
         
-        # Инициализация API ключа
-        genai.configure(api_key=self.api_key)
-        
-        # Получение модели для генерации текста
-        self.model = genai.GenerativeModel('gemini-pro')
+        # Ограничение частоты, параллелизма и повторы запросов к API
+        self.scheduler = LLMScheduler(
+            requests_per_minute=config.GEMINI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=config.GEMINI_TOKENS_PER_MINUTE,
+            max_concurrency=config.GEMINI_MAX_CONCURRENCY,
+            max_retries=config.GEMINI_MAX_RETRIES
+        )
+    
+    @property
+    def model(self):
+        """Модель для генерации текста"""
+        if self._model is None:
+            with self._init_lock:
+                if self._model is None:
+                    if not self.api_key:
+                        logger.error("GEMINI_API_KEY не задан в .env файле")
+                        raise ValueError("GEMINI_API_KEY не задан")
+                    
+                    import google.generativeai as genai
+                    
+                    # Инициализация API ключа
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel('gemini-pro')
+        return self._model
+    
+    @property
+    def cache(self):
+        """Кэш уже перефразированных текстов"""
+        if self._cache is None:
+            with self._init_lock:
+                if self._cache is None:
+                    self._cache = RewriteCache(
+                        os.path.join(config.DATA_DIR, "rewrite_cache.db"),
+                        max_entries=config.REWRITE_CACHE_MAX_ENTRIES,
+                        max_age_seconds=config.REWRITE_CACHE_MAX_AGE_DAYS * 24 * 3600
+                    )
+        return self._cache
+    
+    async def warm_up(self):
+        """Импорт клиента Gemini, создание модели и открытие кэша в отдельном потоке"""
+        await asyncio.to_thread(lambda: (self.model, self.cache))
+
+    async def _generate(self, prompt, mode):
+        """Один запрос к модели с замером длительности; mode - single или batch"""
+        with GEMINI_REQUEST_SECONDS.time(mode=mode):
+            try:
+                return await self.model.generate_content_async(prompt)
+            except Exception:
+                GEMINI_ERRORS.inc(mode=mode)
+                raise
 
-    async def rewrite_content(self, original_content: str) -> str:
+    async def rewrite_content(self, original_content: str) -> str | None:
         """
         Перефразирует содержимое новости с помощью Gemini API
         
@@ -23,13 +105,30 @@ class GeminiHelper:
             original_content (str): Исходный текст новости
         
         Returns:
-            str: Перефразированный текст новости
+            str: Перефразированный текст новости или None, если получить его не удалось
         """
         try:
             # Ограничиваем длину входного текста
-            if len(original_content) > config.MAX_CONTENT_LENGTH:
-                original_content = original_content[:config.MAX_CONTENT_LENGTH] + "..."
+            original_content = self._truncate(original_content)
+            
+            # Повторные тексты (репосты, повторный парсинг) берем из кэша
+            cache_key = rewrite_key(PROMPT_VERSION, original_content)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
             
+            return await self._rewrite_uncached(original_content, cache_key)
+                
+        except Exception as e:
+            logger.error(f"Ошибка при перефразировании контента: {e}")
+            return None
+    
+    async def _rewrite_uncached(self, original_content, cache_key=None):
+        """Запрос к Gemini на перефразирование одной новости (без проверки кэша)"""
+        if cache_key is None:
+            cache_key = rewrite_key(PROMPT_VERSION, original_content)
+        
+        try:
             # Составляем инструкцию для модели
             prompt = f"""
             Ниже приведен текст новости, который нужно перефразировать для публикации в телеграм-канале о Турции (регион Алания и Газипаша).
@@ -44,18 +143,171 @@ class GeminiHelper:
             ```
             """
             
-            # Генерация перефразированного текста
-            response = await self.model.generate_content_async(prompt)
+            # Генерация перефразированного текста (с учетом лимитов и повторов)
+            response = await self.scheduler.run(
+                lambda: self._generate(prompt, "single"),
+                tokens=estimate_tokens(prompt) * 2
+            )
             
             if response.text:
-                return response.text.strip()
+                rewritten = response.text.strip()
+                await asyncio.to_thread(self.cache.put, cache_key, rewritten)
+                return rewritten
             else:
                 logger.warning("Gemini вернул пустой ответ")
-                return "Не удалось перефразировать текст. Пожалуйста, проверьте исходный контент."
+                return None
                 
         except Exception as e:
             logger.error(f"Ошибка при перефразировании контента: {e}")
-            return f"Ошибка при обработке контента: {str(e)[:100]}..."
+            return None
+    
+    def _truncate(self, content):
+        """Ограничение длины входного текста"""
+        if len(content) > config.MAX_CONTENT_LENGTH:
+            return content[:config.MAX_CONTENT_LENGTH] + "..."
+        return content
+    
+    async def rewrite_batch(self, contents: list[str]) -> list[str | None]:
+        """
+        Перефразирует несколько новостей, упаковывая их в общие запросы к Gemini
+        
+        Новости делятся на пакеты не больше GEMINI_BATCH_SIZE штук и
+        GEMINI_BATCH_TOKEN_BUDGET токенов. Если ответ на пакет не удалось
+        разобрать, новости пакета перефразируются по одной; при ошибке
+        запроса (сеть, лимиты) новости пакета возвращаются как None.
+        
+        Args:
+            contents (list[str]): Исходные тексты новостей
+        
+        Returns:
+            list: Перефразированные тексты в том же порядке (None для неудавшихся)
+        """
+        results = [None] * len(contents)
+        truncated = [self._truncate(content) for content in contents]
+        
+        # Тексты из кэша в запрос не попадают; кэш читается в потоке одной транзакцией
+        cached_texts = await asyncio.to_thread(
+            self.cache.get_many, [rewrite_key(PROMPT_VERSION, content) for content in truncated]
+        )
+        missing = []
+        for index, cached in enumerate(cached_texts):
+            if cached is not None:
+                results[index] = cached
+            else:
+                missing.append(index)
+        
+        if len(missing) == 1 or config.GEMINI_BATCH_SIZE <= 1:
+            rewritten = await asyncio.gather(*(self._rewrite_uncached(truncated[i]) for i in missing))
+            for index, text in zip(missing, rewritten):
+                results[index] = text
+            return results
+        
+        batches = self._split_batches(missing, truncated)
+        batch_results = await asyncio.gather(*(self._rewrite_batch_request(batch, truncated) for batch in batches))
+        for batch_result in batch_results:
+            for index, text in batch_result.items():
+                results[index] = text
+        return results
+    
+    def _split_batches(self, indexes, contents):
+        """Разбиение новостей на пакеты по количеству и бюджету токенов"""
+        batches = []
+        current = []
+        current_tokens = 0
+        for index in indexes:
+            tokens = estimate_tokens(contents[index])
+            if current and (len(current) >= config.GEMINI_BATCH_SIZE
+                            or current_tokens + tokens > config.GEMINI_BATCH_TOKEN_BUDGET):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _rewrite_batch_request(self, indexes, contents):
+        """
+        Один запрос к Gemini на пакет новостей
+        
+        Returns:
+            dict: индекс новости -> перефразированный текст или None
+        """
+        if len(indexes) == 1:
+            return {indexes[0]: await self._rewrite_uncached(contents[indexes[0]])}
+        
+        items = json.dumps(
+            [{"id": position, "text": contents[index]} for position, index in enumerate(indexes)],
+            ensure_ascii=False
+        )
+        prompt = BATCH_PROMPT.format(items=items)
+        
+        try:
+            response = await self.scheduler.run(
+                lambda: self._generate(prompt, "batch"),
+                tokens=estimate_tokens(prompt) * 2
+            )
+        except Exception as e:
+            # Сетевая ошибка или исчерпанный лимит (429/5xx после повторов):
+            # запросы по одной только умножили бы нагрузку, новости пакета
+            # вернутся в очередь повторов
+            logger.error(f"Ошибка при пакетном перефразировании: {e}")
+            return {index: None for index in indexes}
+        
+        try:
+            text = response.text or ""
+        except ValueError as e:
+            # Ответ заблокирован фильтрами: текста нет, но запрос дошел
+            logger.warning(f"Пакетный ответ Gemini без текста: {e}")
+            text = ""
+        parsed = self._parse_batch_response(text, len(indexes))
+        
+        results = {}
+        for position, index in enumerate(indexes):
+            text = parsed.get(position)
+            if text:
+                results[index] = text
+        await asyncio.to_thread(
+            self.cache.put_many,
+            [(rewrite_key(PROMPT_VERSION, contents[index]), text) for index, text in results.items()]
+        )
+        
+        # Ответ получен, но разобран не полностью: недостающие новости перефразируем по одной
+        fallback = [index for index in indexes if index not in results]
+        if fallback:
+            logger.warning(f"Пакетный ответ Gemini неполный, по одной обрабатываются {len(fallback)} новостей")
+            rewritten = await asyncio.gather(*(self._rewrite_uncached(contents[index]) for index in fallback))
+            results.update(zip(fallback, rewritten))
+        
+        return results
+    
+    def _parse_batch_response(self, text, count):
+        """
+        Разбор JSON-ответа на пакетный запрос
+        
+        Returns:
+            dict: позиция новости в пакете -> перефразированный текст
+        """
+        try:
+            data = json.loads(_JSON_FENCE_RE.sub("", text.strip()))
+        except ValueError as e:
+            logger.warning(f"Не удалось разобрать пакетный ответ Gemini: {e}")
+            return {}
+        
+        if not isinstance(data, list):
+            logger.warning("Пакетный ответ Gemini не является JSON-массивом")
+            return {}
+        
+        parsed = {}
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            position = item.get("id")
+            text = item.get("text")
+            if isinstance(position, int) and 0 <= position < count and isinstance(text, str) and text.strip():
+                parsed[position] = text.strip()
+        return parsed
 
 # Создание экземпляра помощника Gemini
 gemini_helper = GeminiHelper() 
\ No newline at end of file
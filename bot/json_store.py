@@ -0,0 +1,55 @@
+import json
+import os
+from loguru import logger
+
+
+class JsonStore:
+    """
+    Небольшое хранилище состояния в JSON-файле.
+
+    Данные держатся в памяти, на диск записываются атомарно
+    (через временный файл и os.replace), чтобы сбой во время записи
+    не оставил поврежденный файл.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось прочитать файл состояния {self.path}: {e}")
+            return {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def update(self, values):
+        """Обновление нескольких ключей с одной записью на диск"""
+        self.data.update(values)
+        self.save()
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def pop(self, key, default=None):
+        value = self.data.pop(key, default)
+        self.save()
+        return value
+
+    def save(self):
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить файл состояния {self.path}: {e}")
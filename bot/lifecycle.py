@@ -0,0 +1,76 @@
+"""
+Жизненный цикл статьи
+
+    ingested -> pending -> approved / rejected -> scheduled -> posted / failed
+
+- ingested: сообщение сохранено, перефразированного текста еще нет;
+- pending: текст перефразирован, статья ждет решения администратора;
+- approved: статья одобрена, но еще не поставлена в очередь публикации;
+- rejected: статья отклонена (в том числе отменена публикация);
+- scheduled: статья в очереди публикации;
+- posted: статья опубликована;
+- failed: последняя попытка публикации не удалась, статья остается в очереди.
+
+Хранилища меняют состояние только по разрешенным переходам (TRANSITIONS) и
+запоминают время последнего перехода.
+"""
+
+INGESTED = "ingested"
+PENDING = "pending"
+APPROVED = "approved"
+REJECTED = "rejected"
+SCHEDULED = "scheduled"
+POSTED = "posted"
+FAILED = "failed"
+
+STATES = (INGESTED, PENDING, APPROVED, REJECTED, SCHEDULED, POSTED, FAILED)
+
+# Разрешенные переходы: состояние -> состояния, в которые из него можно перейти
+TRANSITIONS = {
+    INGESTED: (PENDING,),
+    PENDING: (APPROVED, REJECTED),
+    # Одобренную статью можно отклонить повторно или опубликовать вне очереди
+    APPROVED: (SCHEDULED, REJECTED, POSTED),
+    # Отклоненную статью можно одобрить заново
+    REJECTED: (APPROVED,),
+    # Отмена публикации переводит статью в rejected
+    SCHEDULED: (POSTED, FAILED, REJECTED),
+    FAILED: (POSTED, REJECTED),
+    POSTED: (),
+}
+
+# Одобренные, но еще не опубликованные статьи (очередь публикации)
+PUBLISHABLE = (APPROVED, SCHEDULED, FAILED)
+
+# Статьи с окончательным решением, которые переносятся в архив
+FINISHED = (POSTED, REJECTED)
+
+
+def can_transition(old_state, new_state):
+    """Разрешен ли переход из old_state в new_state"""
+    return new_state in TRANSITIONS.get(old_state, ())
+
+
+def legacy_state(is_approved, is_posted, processed_content, is_rejected=False):
+    """
+    Состояние статьи по флагам is_approved/is_posted (строки, сохраненные
+    до появления колонки state, или добавленные в таблицу вручную)
+    """
+    if is_posted:
+        return POSTED
+    if is_rejected:
+        return REJECTED
+    if is_approved:
+        # Одобренные статьи сразу ставились в очередь публикации
+        return SCHEDULED
+    if processed_content:
+        return PENDING
+    return INGESTED
+
+
+def legacy_flags(state):
+    """
+    Флаги (одобрена, отклонена, опубликована) для состояния: хранилища
+    поддерживают их вместе с state для внешних потребителей таблицы
+    """
+    return state in PUBLISHABLE + (POSTED,), state == REJECTED, state == POSTED
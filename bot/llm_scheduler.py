@@ -0,0 +1,93 @@
+import asyncio
+import random
+import time
+from loguru import logger
+
+# HTTP-коды ответов, после которых запрос имеет смысл повторить
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text):
+    """Грубая оценка числа токенов для текста (для кириллицы ~3 символа на токен)"""
+    return max(1, len(text) // 3)
+
+
+def is_retryable(error):
+    """Можно ли повторить запрос после этой ошибки (429, 5xx, таймауты)"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    # Исключения google.api_core хранят HTTP-код в атрибуте code
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS_CODES
+
+
+class TokenBucket:
+    """Ведро токенов: не более rate_per_minute единиц в минуту с допустимым всплеском capacity"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount=1):
+        """Ожидание, пока в ведре накопится amount единиц"""
+        # Запрос больше емкости ведра иначе никогда бы не прошел
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class LLMScheduler:
+    """
+    Планировщик запросов к LLM.
+
+    Ограничивает число запросов и токенов в минуту (ведра токенов), число
+    одновременных запросов и повторяет запросы после 429/5xx с экспоненциальной
+    задержкой и случайным разбросом (full jitter).
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=32000, max_concurrency=3,
+                 max_retries=4, base_delay=1.0, max_delay=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def run(self, call, tokens=1):
+        """
+        Выполняет запрос с учетом лимитов и повторов
+
+        Args:
+            call: функция без аргументов, возвращающая корутину запроса
+            tokens (int): оценка числа токенов запроса
+
+        Returns:
+            Результат запроса; после исчерпания попыток пробрасывает последнюю ошибку
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+
+            try:
+                async with self.semaphore:
+                    return await call()
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                logger.warning(f"Запрос к LLM не удался ({e}), повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
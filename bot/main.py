@@ -1,23 +1,21 @@
 import asyncio
 import logging
+import signal
 import sys
+import time
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.types import BotCommand
 from loguru import logger
 
+from .api_server import create_app, start_server
 from .config import config
+from .gemini_helper import gemini_helper
 from .message_handler import router as message_router
 from .news_parser import news_parser
-from .db import db
-
-# Настройка логирования
-logger.remove()
-logger.add(sys.stderr, level="INFO")
-logger.add("bot_logs.log", rotation="10 MB", level="DEBUG", compression="zip")
-
-# Создаем экземпляр бота
-bot = Bot(token=config.BOT_TOKEN, parse_mode=ParseMode.HTML)
+from .publisher import publish_queue
+from .sender import message_sender
+from .db import async_db
 
 # Создаем диспетчер
 dp = Dispatcher()
@@ -25,60 +23,52 @@ dp = Dispatcher()
 # Регистрируем роутеры
 dp.include_router(message_router)
 
-# Функция для отправки сообщения в целевую группу
+# Экземпляр бота создается при запуске (см. get_bot), импорт модуля не требует токена
+_bot = None
+
+def setup_logging():
+    """
+    Настройка логирования (при запуске бота, а не при импорте модуля)
+    """
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    logger.add("bot_logs.log", rotation="10 MB", level="DEBUG", compression="zip")
+
+def get_bot():
+    """
+    Возвращает экземпляр бота, создавая его при первом вызове
+    """
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=config.BOT_TOKEN, parse_mode=ParseMode.HTML)
+        # Все исходящие сообщения отправляются с учетом лимитов Telegram
+        message_sender.set_bot(_bot)
+    return _bot
+
+# Функция для отправки сообщения в целевые группы
 async def send_message_to_group(text: str):
     """
-    Отправляет сообщение в целевую группу
+    Отправляет сообщение во все целевые группы (TARGET_GROUP_IDS) параллельно
     
     Args:
         text (str): Текст сообщения
+    
+    Returns:
+        bool: True, если сообщение доставлено хотя бы в одну группу
     """
-    try:
-        await bot.send_message(
-            chat_id=config.TARGET_GROUP_ID,
-            text=text,
-            parse_mode=ParseMode.HTML
-        )
-        logger.info(f"Сообщение успешно отправлено в группу {config.TARGET_GROUP_ID}")
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка при отправке сообщения в группу: {e}")
-        return False
-
-# Функция для публикации одобренных новостей
-async def publish_approved_news():
-    """
-    Публикует одобренные новости в целевую группу
-    """
-    while True:
-        try:
-            # Получаем одобренные, но неопубликованные новости
-            articles = db.get_approved_not_posted_articles(limit=1)
-            
-            if articles:
-                # Публикуем каждую новость
-                for article_id, content in articles:
-                    success = await send_message_to_group(content)
-                    
-                    if success:
-                        # Отмечаем новость как опубликованную
-                        db.mark_as_posted(article_id)
-                        logger.info(f"Новость ID {article_id} успешно опубликована")
-                    else:
-                        logger.error(f"Не удалось опубликовать новость ID {article_id}")
-                    
-                    # Делаем небольшую паузу между публикациями
-                    await asyncio.sleep(5)
-            
-            # Ждем 30 минут до следующей проверки
-            await asyncio.sleep(30 * 60)
-        
-        except Exception as e:
-            logger.error(f"Ошибка в процессе публикации новостей: {e}")
-            await asyncio.sleep(300)  # 5 минут
+    results = await message_sender.broadcast(config.TARGET_GROUP_IDS, text, parse_mode=ParseMode.HTML)
+    delivered = [chat_id for chat_id, success in results.items() if success]
+    failed = [chat_id for chat_id, success in results.items() if not success]
+    
+    if delivered:
+        logger.info(f"Сообщение успешно отправлено в группы {delivered}")
+    if failed:
+        logger.error(f"Не удалось отправить сообщение в группы {failed}")
+    # Повторная отправка продублировала бы сообщение в группах, куда оно уже дошло
+    return bool(delivered)
 
 # Функция для настройки команд бота
-async def set_bot_commands():
+async def set_bot_commands(bot):
     """
     Настраивает команды бота для меню
     """
@@ -107,29 +97,178 @@ async def manual_parse_news():
         logger.error(f"Ошибка при ручном парсинге новостей: {e}")
         return False
 
+# Периодический перенос старых статей в архив
+async def run_periodic_archival():
+    """
+    Переносит опубликованные и отклоненные статьи старше ARCHIVE_AFTER_DAYS дней
+    в помесячный архив раз в ARCHIVE_INTERVAL_HOURS часов
+    """
+    while True:
+        try:
+            archived = await async_db.archive_old_articles(config.ARCHIVE_AFTER_DAYS)
+            if archived:
+                logger.info(f"В архив перенесено статей: {archived}")
+            await asyncio.sleep(config.ARCHIVE_INTERVAL_HOURS * 3600)
+        except Exception as e:
+            logger.error(f"Ошибка при переносе статей в архив: {e}")
+            # В случае ошибки делаем паузу перед повторной попыткой
+            await asyncio.sleep(600)
+
+async def wait_for_shutdown_signal():
+    """
+    Ожидает SIGINT/SIGTERM (в режиме webhook нет start_polling, который сам их обрабатывает)
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: остается обработка KeyboardInterrupt
+            pass
+    await stop_event.wait()
+    logger.info("Получен сигнал остановки")
+
+# Запуск бота в режиме webhook
+async def run_webhook(bot):
+    """
+    Принимает обновления Telegram через webhook с проверкой секретного токена
+
+    Webhook слушает WEBHOOK_HOST:WEBHOOK_PORT, который проксируется в интернет;
+    HTTP API запускается отдельным сервером на API_HOST:API_PORT и наружу не попадает.
+    """
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+    
+    if not config.WEBHOOK_BASE_URL:
+        raise ValueError("Для BOT_RUN_MODE=webhook необходимо указать WEBHOOK_BASE_URL")
+    
+    if config.WEBHOOK_PORT == config.API_PORT and config.API_ENABLED:
+        raise ValueError("WEBHOOK_PORT должен отличаться от API_PORT: HTTP API не публикуется вместе с webhook")
+    
+    app = create_app(bot, include_api=False)
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.WEBHOOK_SECRET or None
+    ).register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    
+    runner = await start_server(app, config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+    api_runner = None
+    try:
+        if config.API_ENABLED:
+            api_runner = await start_server(create_app(bot))
+        webhook_url = config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH
+        await bot.set_webhook(
+            url=webhook_url,
+            secret_token=config.WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"Бот запущен в режиме webhook: {webhook_url}")
+        await wait_for_shutdown_signal()
+    finally:
+        # Останавливаем серверы: обработчик webhook дожидается текущих обновлений
+        if api_runner is not None:
+            await api_runner.cleanup()
+        await runner.cleanup()
+
+async def _timed(name, coro, timings):
+    """Выполняет корутину и записывает время ее выполнения в timings[name]"""
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = time.perf_counter() - started
+
+async def warm_up(bot, timings):
+    """
+    Параллельная инициализация компонентов: подключение к хранилищу, импорт
+    клиента Gemini, запуск Telethon, настройка команд бота и загрузка очереди публикации
+    """
+    # Загрузка очереди публикации и индекса дубликатов ждет создания хранилища
+    publish_queue.set_sender(send_message_to_group)
+    await asyncio.gather(
+        _timed("storage", async_db.warm_up(), timings),
+        _timed("gemini", gemini_helper.warm_up(), timings),
+        _timed("news_parser", news_parser.start(), timings),
+        _timed("bot_commands", set_bot_commands(bot), timings),
+        _timed("publish_queue", publish_queue.load(), timings),
+    )
+
+def log_startup_profile(timings):
+    """
+    Отчет о времени запуска и потреблении памяти (флаг --startup-profile)
+    """
+    lines = [f"{name}: {seconds:.3f} с" for name, seconds in timings.items()]
+    
+    try:
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"Память Python: {current / 2**20:.1f} МБ (пик {peak / 2**20:.1f} МБ)")
+    except ImportError:
+        pass
+    
+    try:
+        import resource
+        # ru_maxrss в Linux - в килобайтах
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        lines.append(f"Максимальный RSS: {rss / 1024:.1f} МБ")
+    except ImportError:
+        pass
+    
+    logger.info("Профиль запуска:\n" + "\n".join(lines))
+
 # Основная функция для запуска бота
-async def main():
+async def main(startup_profile=False, timings=None):
     """
     Основная функция для запуска бота
+    
+    Args:
+        startup_profile (bool): вывести время запуска компонентов и потребление памяти
+        timings (dict): уже измеренные этапы запуска (например, импорт модулей)
     """
+    setup_logging()
+    timings = dict(timings or {})
+    bot = get_bot()
+    api_runner = None
     try:
-        # Настраиваем команды бота
-        await set_bot_commands()
-        
-        # Запускаем парсер новостей
-        await news_parser.start()
+        # Инициализируем компоненты параллельно
+        await _timed("warm_up", warm_up(bot, timings), timings)
+        if startup_profile:
+            log_startup_profile(timings)
         
         # Запускаем задачи в фоновом режиме
         asyncio.create_task(news_parser.run_periodic_parsing())
-        asyncio.create_task(publish_approved_news())
+        asyncio.create_task(publish_queue.run())
+        if config.ARCHIVE_AFTER_DAYS > 0:
+            asyncio.create_task(run_periodic_archival())
         
-        # Запускаем бота
-        logger.info("Бот запущен")
-        await dp.start_polling(bot)
+        if config.BOT_RUN_MODE == "webhook":
+            # Webhook и HTTP API обслуживаются отдельными серверами
+            await run_webhook(bot)
+        else:
+            # Запускаем HTTP API в том же цикле событий
+            if config.API_ENABLED:
+                api_runner = await start_server(create_app(bot))
+            
+            # Удаляем webhook, если бот раньше работал в этом режиме
+            await bot.delete_webhook()
+            
+            # Запускаем бота
+            logger.info("Бот запущен")
+            await dp.start_polling(bot)
     finally:
+        # Останавливаем HTTP API
+        if api_runner is not None:
+            await api_runner.cleanup()
+        
         # Останавливаем парсер новостей
         await news_parser.stop()
         
+        # Отправляем в базу данных накопленные изменения и останавливаем пул потоков
+        await async_db.close()
+        
         # Закрываем сессию бота
         await bot.session.close()
         logger.info("Бот остановлен")
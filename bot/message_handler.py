@@ -1,12 +1,18 @@
 from aiogram import Router, F
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from aiogram.filters import Command, CommandStart
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from loguru import logger
 
 from .config import config
 # Используем фабрику базы данных вместо прямого импорта
-from .db import db
+from .db import async_db
+from .lifecycle import PENDING, PUBLISHABLE
+from .metrics import NEWS_APPROVED
+from .publisher import publish_queue
+from .sender import MESSAGE_LIMIT, message_sender, split_html
+from .stats import stats
 
 # Создаем роутер для обработки сообщений
 router = Router()
@@ -68,6 +74,195 @@ async def cmd_help(message: Message):
     
     await message.answer(help_text, parse_mode="HTML")
 
+# Флажки выбора статей для пакетных действий
+UNCHECKED = "☐"
+CHECKED = "☑️"
+
+# Постраничные списки статей: состояния, порядок показа и подписи.
+# Ключ списка передается в callback_data кнопок навигации
+PAGE_VIEWS = {
+    "pending": {
+        "states": (PENDING,),
+        "newest_first": True,
+        "title": "📋 <b>Ожидают одобрения:</b> {total}",
+        "empty": "🔍 Нет новостей, ожидающих одобрения.",
+    },
+    # Все одобренные, но не опубликованные статьи, как в очереди публикации
+    "approved": {
+        "states": PUBLISHABLE,
+        "newest_first": False,
+        "title": "📋 <b>Одобрены и ожидают публикации:</b> {total}",
+        "empty": "🔍 Нет одобренных, но неопубликованных новостей.",
+    },
+}
+
+# Превью статьи на странице не короче этого числа символов: статьи, для
+# которых места не осталось, переносятся на следующую страницу
+MIN_PREVIEW_LENGTH = 200
+
+def _preview(text, limit):
+    """Начало текста статьи не длиннее limit символов без разрыва HTML-разметки"""
+    parts = split_html(text, limit)
+    return parts[0] if len(parts) == 1 else parts[0] + "…"
+
+async def render_page(view_name, direction="f", cursor_id=None):
+    """
+    Формирует страницу статей для просмотра в одном сообщении
+    
+    Args:
+        view_name (str): список статей из PAGE_VIEWS: "pending" или "approved"
+        direction (str): "f" - первая страница, "n" - после статьи cursor_id, "p" - перед ней
+        cursor_id (int): ID статьи, от которой отсчитывается страница
+    
+    Returns:
+        tuple: (текст, клавиатура); клавиатура None, если статей нет
+    """
+    view = PAGE_VIEWS[view_name]
+    articles, has_prev, has_next = await async_db.get_articles_page(
+        view["states"],
+        limit=config.MODERATION_PAGE_SIZE,
+        after_id=cursor_id if direction == "n" else None,
+        before_id=cursor_id if direction == "p" else None,
+        newest_first=view["newest_first"]
+    )
+    
+    if not articles:
+        if direction != "f":
+            # Страница опустела (статьи обработаны) - показываем первую
+            return await render_page(view_name)
+        return view["empty"], None
+    
+    by_status = stats.snapshot()["by_status"]
+    total = sum(by_status[state] for state in view["states"])
+    # Место под превью делится между статьями страницы
+    preview_limit = max(MIN_PREVIEW_LENGTH, (MESSAGE_LIMIT - 300) // len(articles) - 100)
+    
+    blocks = [view["title"].format(total=total)]
+    length = len(blocks[0])
+    shown = []
+    for article_id, source, processed, created_at in articles:
+        header = f"<b>ID {article_id}</b> · {source} · {created_at[:16].replace('T', ' ')}\n"
+        # Страница не должна превышать лимит сообщения (разделитель и "…" учтены)
+        limit = min(preview_limit, MESSAGE_LIMIT - length - len(header) - 3)
+        if limit < MIN_PREVIEW_LENGTH and shown:
+            # Остальные статьи покажет следующая страница
+            has_next = True
+            break
+        block = header + _preview(processed, max(limit, 1))
+        blocks.append(block)
+        length += len(block) + 2
+        shown.append((article_id, source, processed, created_at))
+    articles = shown
+    
+    buttons = []
+    for article_id, _, _, _ in articles:
+        if view_name == "pending":
+            # Флажок выбора для пакетных действий хранится прямо в клавиатуре
+            buttons.append([
+                InlineKeyboardButton(text=f"{UNCHECKED} {article_id}", callback_data=f"toggle_{article_id}"),
+                InlineKeyboardButton(text="✅", callback_data=f"approve_{article_id}"),
+                InlineKeyboardButton(text="❌", callback_data=f"reject_{article_id}"),
+                InlineKeyboardButton(text="🔍", callback_data=f"original_{article_id}")
+            ])
+        else:
+            buttons.append([
+                InlineKeyboardButton(text=f"📢 {article_id}", callback_data=f"publish_{article_id}"),
+                InlineKeyboardButton(text=f"🛑 {article_id}", callback_data=f"cancel_{article_id}")
+            ])
+    
+    if view_name == "pending":
+        # Пакетные действия: вся страница, выбранные статьи, все статьи источника
+        buttons.append([
+            InlineKeyboardButton(text="✅ Все на странице", callback_data="bulk_approve_page"),
+            InlineKeyboardButton(text="✅ Выбранные", callback_data="bulk_approve_selected"),
+            InlineKeyboardButton(text="❌ Выбранные", callback_data="bulk_reject_selected")
+        ])
+        sources = {}
+        for article_id, source, _, _ in articles:
+            sources.setdefault(source, article_id)
+        for source, article_id in sources.items():
+            buttons.append([
+                InlineKeyboardButton(text=f"🚫 Отклонить все из {source[:30]}", callback_data=f"bulk_rejectsource_{article_id}")
+            ])
+    
+    # Навигация; кнопка обновления повторяет запрос, которым построена страница
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton(text="◀️", callback_data=f"page_{view_name}_p_{articles[0][0]}"))
+    navigation.append(InlineKeyboardButton(text="🔄", callback_data=f"page_{view_name}_{direction}_{cursor_id or 0}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(text="▶️", callback_data=f"page_{view_name}_n_{articles[-1][0]}"))
+    buttons.append(navigation)
+    
+    return "\n\n".join(blocks), InlineKeyboardMarkup(inline_keyboard=buttons)
+
+def _page_article_ids(markup, selected_only=False):
+    """ID статей страницы (или только отмеченных флажком) по кнопкам выбора"""
+    article_ids = []
+    for row in markup.inline_keyboard if markup else []:
+        for button in row:
+            if not (button.callback_data or "").startswith("toggle_"):
+                continue
+            if selected_only and not button.text.startswith(CHECKED):
+                continue
+            article_ids.append(int(button.callback_data.split("_")[1]))
+    return article_ids
+
+def _toggle_markup(markup, callback_data):
+    """Клавиатура с переключенным флажком выбора статьи"""
+    rows = []
+    for row in markup.inline_keyboard:
+        new_row = []
+        for button in row:
+            text = button.text
+            if button.callback_data == callback_data:
+                mark, _, label = text.partition(" ")
+                text = f"{UNCHECKED if mark == CHECKED else CHECKED} {label}"
+            new_row.append(InlineKeyboardButton(text=text, callback_data=button.callback_data))
+        rows.append(new_row)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def _confirm_markup(markup, callback_data, confirm_text, confirm_data):
+    """Клавиатура, в которой строка с кнопкой callback_data заменена кнопками подтверждения"""
+    rows = []
+    for row in markup.inline_keyboard:
+        if any(button.callback_data == callback_data for button in row):
+            rows.append([
+                InlineKeyboardButton(text=confirm_text, callback_data=confirm_data),
+                InlineKeyboardButton(text="↩️ Отмена", callback_data="bulk_cancel_0")
+            ])
+        else:
+            rows.append(row)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def _page_request(message):
+    """Параметры страницы из кнопки обновления сообщения или None, если это не страница"""
+    markup = message.reply_markup
+    if not markup:
+        return None
+    for row in markup.inline_keyboard:
+        for button in row:
+            if button.callback_data and button.callback_data.startswith("page_") and button.text == "🔄":
+                _, view_name, direction, cursor_id = button.callback_data.split("_")
+                if view_name not in PAGE_VIEWS:
+                    # Страница, отправленная до переименования списка
+                    return None
+                return view_name, direction, int(cursor_id) or None
+    return None
+
+async def show_page(message, view_name, direction="f", cursor_id=None, edit=False):
+    """Отправка страницы новым сообщением или замена содержимого текущего"""
+    text, keyboard = await render_page(view_name, direction, cursor_id)
+    if not edit:
+        await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+        return
+    try:
+        await message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        # Страница не изменилась - это не ошибка
+        if "message is not modified" not in str(e):
+            raise
+
 # Обработчик для команды /pending (показать ожидающие одобрения новости)
 @router.message(Command("pending"))
 async def cmd_pending(message: Message):
@@ -77,37 +272,8 @@ async def cmd_pending(message: Message):
         await message.answer("⛔️ У вас нет прав на выполнение этой команды.")
         return
     
-    # Получаем ожидающие одобрения новости из БД
-    pending_articles = db.get_pending_articles(limit=5)
-    
-    if not pending_articles:
-        await message.answer("🔍 Нет новостей, ожидающих одобрения.")
-        return
-    
-    await message.answer(f"📋 Найдено {len(pending_articles)} ожидающих одобрения новостей:")
-    
-    # Отправляем каждую новость отдельным сообщением
-    for article_id, source, original, processed in pending_articles:
-        # Создаем клавиатуру с кнопками действий
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Одобрить", callback_data=f"approve_{article_id}"),
-                InlineKeyboardButton(text="❌ Отклонить", callback_data=f"reject_{article_id}")
-            ],
-            [
-                InlineKeyboardButton(text="🔍 Оригинал", callback_data=f"original_{article_id}")
-            ]
-        ])
-        
-        # Отправляем сообщение с перефразированным контентом
-        article_text = (
-            f"<b>ID статьи:</b> {article_id}\n"
-            f"<b>Источник:</b> {source}\n\n"
-            f"{processed}\n\n"
-            f"<i>Примите решение по этой новости</i>"
-        )
-        
-        await message.answer(article_text, parse_mode="HTML", reply_markup=keyboard)
+    # Все новости просматриваются постранично в одном сообщении
+    await show_page(message, "pending")
 
 # Обработчик для команды /approved (показать одобренные новости)
 @router.message(Command("approved"))
@@ -118,33 +284,34 @@ async def cmd_approved(message: Message):
         await message.answer("⛔️ У вас нет прав на выполнение этой команды.")
         return
     
-    # Получаем одобренные новости из БД
-    approved_articles = db.get_approved_not_posted_articles()
-    
-    if not approved_articles:
-        await message.answer("🔍 Нет одобренных, но неопубликованных новостей.")
+    # Одобренные статьи в очереди публикации, в том числе после неудачной попытки
+    await show_page(message, "approved")
+
+# Обработчик кнопок перелистывания страниц
+@router.callback_query(F.data.startswith("page_"))
+async def process_page_callback(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔️ У вас нет прав на выполнение этого действия.", show_alert=True)
         return
     
-    await message.answer(f"📋 Найдено {len(approved_articles)} одобренных новостей, ожидающих публикации:")
+    _, view_name, direction, cursor_id = callback.data.split("_")
+    if view_name not in PAGE_VIEWS:
+        await callback.answer()
+        return
     
-    # Отправляем каждую новость отдельным сообщением
-    for article_id, content in approved_articles:
-        # Создаем клавиатуру с кнопками действий
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data=f"publish_{article_id}"),
-                InlineKeyboardButton(text="❌ Отменить", callback_data=f"cancel_{article_id}")
-            ]
-        ])
-        
-        # Отправляем сообщение с перефразированным контентом
-        article_text = (
-            f"<b>ID статьи:</b> {article_id}\n\n"
-            f"{content}\n\n"
-            f"<i>Эта новость одобрена и ожидает публикации</i>"
-        )
-        
-        await message.answer(article_text, parse_mode="HTML", reply_markup=keyboard)
+    await show_page(callback.message, view_name, direction, int(cursor_id) or None, edit=True)
+    await callback.answer()
+
+async def _show_result(callback, note):
+    """
+    Итог действия: страница, в которой нажата кнопка, обновляется на месте,
+    а в сообщение отдельной статьи дописывается отметка
+    """
+    page = _page_request(callback.message)
+    if page:
+        await show_page(callback.message, *page, edit=True)
+    else:
+        await callback.message.edit_text(f"{callback.message.text}\n\n{note}", parse_mode="HTML")
 
 # Обработчик колбэков от инлайн-кнопок
 @router.callback_query(F.data.startswith(("approve_", "reject_", "publish_", "cancel_", "original_")))
@@ -160,7 +327,7 @@ async def process_callback(callback: CallbackQuery):
     article_id = int(article_id_str)
     
     # Получаем информацию о статье
-    article = db.get_article_by_id(article_id)
+    article = await async_db.get_article_by_id(article_id)
     
     if not article:
         await callback.answer("❌ Статья не найдена.", show_alert=True)
@@ -168,53 +335,123 @@ async def process_callback(callback: CallbackQuery):
     
     if action == "approve":
         # Одобряем статью
-        if db.approve_article(article_id):
-            await callback.message.edit_text(
-                f"{callback.message.text}\n\n✅ <b>Статья одобрена</b>",
-                parse_mode="HTML"
-            )
+        if await async_db.approve_article(article_id):
+            # Ставим в очередь публикации, цикл публикации проснется сразу
+            await publish_queue.schedule([article_id])
+            NEWS_APPROVED.inc()
+            await _show_result(callback, "✅ <b>Статья одобрена</b>")
             await callback.answer("✅ Статья одобрена и будет опубликована по расписанию")
         else:
             await callback.answer("❌ Ошибка при одобрении статьи", show_alert=True)
     
     elif action == "reject":
-        # Удаляем сообщение с отклоненной статьей
-        await callback.message.edit_text(
-            f"{callback.message.text}\n\n❌ <b>Статья отклонена</b>",
-            parse_mode="HTML"
-        )
-        await callback.answer("❌ Статья отклонена")
+        # Отклонение сохраняется, статья больше не попадает в /pending
+        if await async_db.reject_articles([article_id]):
+            await _show_result(callback, "❌ <b>Статья отклонена</b>")
+            await callback.answer("❌ Статья отклонена")
+        else:
+            await callback.answer("❌ Статья уже не ожидает одобрения", show_alert=True)
     
     elif action == "publish":
-        # Отмечаем как опубликованную
-        if db.mark_as_posted(article_id):
-            # Здесь должна быть логика публикации в группу
-            # Эта функциональность будет реализована в основном модуле
-            await callback.message.edit_text(
-                f"{callback.message.text}\n\n📢 <b>Статья отправлена на публикацию</b>",
-                parse_mode="HTML"
-            )
+        # Публикуем вне очереди (статья отмечается как опубликованная)
+        if await publish_queue.publish_article(article_id):
+            await _show_result(callback, "📢 <b>Статья отправлена на публикацию</b>")
             await callback.answer("📢 Статья отправлена на публикацию")
         else:
             await callback.answer("❌ Ошибка при публикации статьи", show_alert=True)
     
     elif action == "cancel":
-        # Отменяем публикацию
-        await callback.message.edit_text(
-            f"{callback.message.text}\n\n🛑 <b>Публикация отменена</b>",
-            parse_mode="HTML"
-        )
-        await callback.answer("🛑 Публикация отменена")
+        # Отмена сохраняется: статья отклоняется и не вернется в очередь после перезапуска
+        if await publish_queue.cancel(article_id):
+            await _show_result(callback, "🛑 <b>Публикация отменена</b>")
+            await callback.answer("🛑 Публикация отменена")
+        else:
+            await callback.answer("❌ Статья уже не ожидает публикации", show_alert=True)
     
     elif action == "original":
         # Показываем оригинальный текст
         original_text = article["original_content"]
-        await callback.message.answer(
+        # Оригинал может быть длиннее лимита сообщения - отправляем частями
+        await message_sender.send(
+            callback.message.chat.id,
             f"<b>Оригинальный текст статьи ID {article_id}:</b>\n\n{original_text}",
             parse_mode="HTML"
         )
         await callback.answer()
 
+# Обработчик пакетной модерации и флажков выбора
+@router.callback_query(F.data.startswith(("toggle_", "bulk_")))
+async def process_bulk_callback(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔️ У вас нет прав на выполнение этого действия.", show_alert=True)
+        return
+    
+    markup = callback.message.reply_markup
+    if callback.data.startswith("toggle_"):
+        # Меняется только клавиатура, без обращения к базе
+        await callback.message.edit_reply_markup(reply_markup=_toggle_markup(markup, callback.data))
+        await callback.answer()
+        return
+    
+    _, action, target = callback.data.split("_")
+    
+    # Все действия выполняются одной пакетной записью в хранилище
+    if action == "approve":
+        article_ids = _page_article_ids(markup, selected_only=target == "selected")
+        if not article_ids:
+            await callback.answer("Не выбрано ни одной статьи", show_alert=True)
+            return
+        approved = await async_db.approve_articles(article_ids)
+        await publish_queue.schedule(approved)
+        NEWS_APPROVED.inc(len(approved))
+        result = f"✅ Одобрено статей: {len(approved)}"
+    
+    elif action == "reject":
+        article_ids = _page_article_ids(markup, selected_only=True)
+        if not article_ids:
+            await callback.answer("Не выбрано ни одной статьи", show_alert=True)
+            return
+        rejected = await async_db.reject_articles(article_ids)
+        result = f"❌ Отклонено статей: {len(rejected)}"
+    
+    elif action in ("rejectsource", "confirmsource"):
+        article = await async_db.get_article_by_id(int(target))
+        if not article:
+            await callback.answer("❌ Статья не найдена.", show_alert=True)
+            return
+        source = article["source_group"]
+        if action == "rejectsource":
+            # Действие затрагивает все ожидающие статьи источника, а не только
+            # страницу, поэтому сначала показываем их количество и ждем подтверждения
+            count = await async_db.count_pending_by_source(source)
+            await callback.message.edit_reply_markup(reply_markup=_confirm_markup(
+                markup, callback.data, f"🚫 Да, отклонить {count}", f"bulk_confirmsource_{target}"
+            ))
+            await callback.answer(
+                f"Будут отклонены все ожидающие статьи из {source}: {count}. Подтвердите действие.",
+                show_alert=True
+            )
+            return
+        rejected = await async_db.reject_pending_by_source(source)
+        result = f"🚫 Отклонено статей из {source}: {len(rejected)}"
+    
+    elif action == "cancel":
+        # Отмена подтверждения: страница возвращается к обычному виду
+        page = _page_request(callback.message)
+        if page:
+            await show_page(callback.message, *page, edit=True)
+        await callback.answer()
+        return
+    
+    else:
+        await callback.answer()
+        return
+    
+    page = _page_request(callback.message)
+    if page:
+        await show_page(callback.message, *page, edit=True)
+    await callback.answer(result, show_alert=True)
+
 # Обработчик команды /status (показать статус бота)
 @router.message(Command("status"))
 async def cmd_status(message: Message):
@@ -233,16 +470,39 @@ async def cmd_status(message: Message):
         "✅ Парсер новостей активен\n\n"
     )
     
-    # Статистика из БД (примерная реализация)
-    pending_count = len(db.get_pending_articles(limit=100))
-    approved_count = len(db.get_approved_not_posted_articles(limit=100))
+    # Счетчики обновляются при каждой записи в базу - статьи не перечитываются
+    snapshot = stats.snapshot()
+    by_status = snapshot["by_status"]
+    latency = snapshot["rewrite_latency"]
     
     status_text += (
         f"📈 <b>Статистика:</b>\n"
-        f"• Ожидает одобрения: {pending_count}\n"
-        f"• Одобрено и ожидает публикации: {approved_count}\n"
+        f"• Всего статей: {snapshot['total']}\n"
+        f"• Ожидает перефразирования: {by_status['ingested']}\n"
+        f"• Ожидает одобрения: {by_status['pending']}\n"
+        f"• Одобрено и ожидает публикации: {snapshot['publish_backlog']}\n"
+        f"• Отклонено: {by_status['rejected']}\n"
+        f"• В очереди публикации: {len(publish_queue)}\n"
+        f"• Ошибка последней публикации: {by_status['failed']}\n"
+        f"• Опубликовано: {by_status['posted']}\n"
+        f"• Получено за последний час: {snapshot['ingested_last_hour']}\n"
     )
     
+    if latency["samples"]:
+        status_text += (
+            f"• Время перефразирования (p50/p90/p99): "
+            f"{latency['p50']:.1f} / {latency['p90']:.1f} / {latency['p99']:.1f} с\n"
+        )
+    
+    if snapshot["by_source"]:
+        status_text += "\n📡 <b>Источники:</b>\n"
+        for source_group, count in snapshot["by_source"].items():
+            status_text += f"• {source_group}: {count}\n"
+    
+    status_text += "\n📅 <b>По дням:</b>\n"
+    for day, count in snapshot["by_day"].items():
+        status_text += f"• {day}: {count}\n"
+    
     await message.answer(status_text, parse_mode="HTML")
 
 # Обработчик команды /run_parser (ручной запуск парсинга)
@@ -0,0 +1,217 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+# Границы корзин гистограмм по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Префикс имен всех метрик бота
+PREFIX = "newsbot_"
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """Общая часть метрик: имя, описание, метки и блокировка (метрики меняются из разных потоков)"""
+
+    type = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self):
+        """Строки значений метрики: (суффикс имени, значения меток, доп. метка, значение)"""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, label_values, extra, value in self._samples():
+            labels = _format_labels(self.labelnames, label_values, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name + "_total", documentation, labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        return [("", key, None, value) for key, value in values]
+
+
+class Gauge(_Metric):
+    """
+    Текущее значение. Если задана функция func, значение вычисляется при каждом
+    чтении метрик: число для метрики без меток или словарь {значения меток: число}
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.func is not None:
+            try:
+                value = self.func()
+            except Exception:
+                # Метрика не должна ломать выдачу остальных
+                return []
+            if not isinstance(value, dict):
+                value = {(): value}
+            items = sorted((tuple(str(v) for v in key), number) for key, number in value.items())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [("", key, None, value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """Распределение длительностей по корзинам (сумма и количество наблюдений)"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Замер длительности блока кода (в том числе с await внутри)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, ("le", _format_value(bound)), cumulative))
+            samples.append(("_sum", key, None, total))
+            samples.append(("_count", key, None, count))
+        return samples
+
+
+class Registry:
+    """Набор метрик бота и их выдача в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), func=None):
+        return self._register(Gauge(name, documentation, labelnames, func))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Реестр метрик бота
+registry = Registry()
+
+# Длительность обращений к внешним API
+TELETHON_FETCH_SECONDS = registry.histogram(
+    "telethon_fetch_seconds", "Получение новых сообщений группы через Telethon")
+GEMINI_REQUEST_SECONDS = registry.histogram(
+    "gemini_request_seconds", "Запрос к Gemini (без ожидания лимитов)", ("mode",))
+SHEETS_API_SECONDS = registry.histogram(
+    "sheets_api_seconds", "Вызов Google Sheets API", ("method",))
+TELEGRAM_SEND_SECONDS = registry.histogram(
+    "telegram_send_seconds", "Отправка сообщения ботом")
+
+# Ошибки внешних API
+GEMINI_ERRORS = registry.counter(
+    "gemini_errors", "Ошибки запросов к Gemini", ("mode",))
+SHEETS_API_ERRORS = registry.counter(
+    "sheets_api_errors", "Ошибки вызовов Google Sheets API", ("method",))
+TELEGRAM_SEND_ERRORS = registry.counter(
+    "telegram_send_errors", "Ошибки отправки сообщений ботом", ("reason",))
+
+# Прохождение новостей по этапам
+NEWS_INGESTED = registry.counter("news_ingested", "Сообщения из источников, переданные в обработку")
+NEWS_DEDUPLICATED = registry.counter("news_deduplicated", "Сообщения, отброшенные как дубликаты")
+NEWS_REWRITTEN = registry.counter("news_rewritten", "Успешно перефразированные новости")
+NEWS_APPROVED = registry.counter("news_approved", "Одобренные администраторами статьи")
+NEWS_PUBLISHED = registry.counter("news_published", "Опубликованные статьи")
@@ -1,24 +1,112 @@
-from telethon import TelegramClient, events
-from telethon.tl.types import Channel, User
 from loguru import logger
 import asyncio
+import os
+import threading
+import time
 from datetime import datetime, timedelta
 
 from .config import config
-from .db import db
+from .db import async_db
+from .dedup import DedupIndex
 from .gemini_helper import gemini_helper
+from .json_store import JsonStore
+from .metrics import NEWS_DEDUPLICATED, NEWS_INGESTED, NEWS_REWRITTEN, TELETHON_FETCH_SECONDS, registry
+from .pipeline import Pipeline, PipelineStage
+from .stats import stats
+
+class NewsItem:
+    """Сообщение из источника на пути через конвейер обработки"""
+    __slots__ = ("source_group", "message_id", "text", "processed_content", "attempts", "received_at")
+    
+    def __init__(self, source_group, message_id, text, attempts=0):
+        self.source_group = source_group
+        self.message_id = message_id
+        self.text = text
+        self.processed_content = None
+        self.attempts = attempts
+        # Для статистики времени перефразирования
+        self.received_at = time.monotonic()
+    
+    def to_dict(self):
+        return {
+            "source_group": self.source_group,
+            "message_id": self.message_id,
+            "text": self.text,
+            "attempts": self.attempts,
+        }
 
 class NewsParser:
     def __init__(self):
-        # Проверяем, настроены ли обязательные параметры
-        if not config.TELEGRAM_API_ID or not config.TELEGRAM_API_HASH:
-            logger.error("Необходимо указать TELEGRAM_API_ID и TELEGRAM_API_HASH в .env файле")
-            raise ValueError("TELEGRAM_API_ID и TELEGRAM_API_HASH не заданы")
+        # Клиент Telethon и кэш групп создаются при первом обращении (см. client)
+        self._client = None
+        self._entities = None
+        self._init_lock = threading.Lock()
+        
+        # Конвейер обработки: фильтрация -> перефразирование -> сохранение
+        self.pipeline = Pipeline([
+            PipelineStage("filter", self._filter_stage, config.PARSER_FILTER_CONCURRENCY),
+            PipelineStage("rewrite", self._rewrite_stage, config.PARSER_REWRITE_CONCURRENCY,
+                          batch_size=config.GEMINI_BATCH_SIZE,
+                          batch_wait=config.PARSER_REWRITE_BATCH_WAIT_SECONDS),
+            PipelineStage("persist", self._persist_stage, config.PARSER_PERSIST_CONCURRENCY),
+        ], queue_size=config.PARSER_QUEUE_SIZE)
+        
+        # Ограничение числа одновременных запросов к Telegram
+        self._fetch_semaphore = asyncio.Semaphore(max(1, config.PARSER_FETCH_CONCURRENCY))
+        # Момент (по часам цикла событий), до которого Telegram запретил запросы
+        self._flood_wait_until = 0.0
+        
+        # ID последнего сообщения группы, полученного периодическим парсингом. Поток
+        # реального времени курсор не двигает: сообщения, пропущенные потоком (переподключение,
+        # простой бота), догружаются опросом, а полученные потоком отсеиваются по ID источника
+        self.high_water_marks = JsonStore(os.path.join(config.DATA_DIR, "parser_state.json"))
         
-        # Создаем клиент Telethon для работы с Telegram API
-        self.client = TelegramClient('news_parser_session', 
-                                    config.TELEGRAM_API_ID,
-                                    config.TELEGRAM_API_HASH)
+        # Индекс уже сохраненных сообщений и их текстов для отсева дубликатов
+        self.dedup = DedupIndex(
+            path=os.path.join(config.DATA_DIR, "dedup_index.json"),
+            max_entries=config.DEDUP_MAX_ENTRIES,
+            max_distance=config.DEDUP_MAX_DISTANCE
+        )
+        
+        # Сообщения, которые не удалось перефразировать: повторяются в следующих циклах
+        self.retry_store = JsonStore(os.path.join(config.DATA_DIR, "rewrite_retry.json"))
+        self.retry_queue = [NewsItem(**item) for item in self.retry_store.get("items", [])]
+        
+        # ID чата -> название группы из SOURCE_GROUPS (для событий реального времени)
+        self._group_names = {}
+        
+        # Не даем плановому и ручному парсингу идти одновременно
+        self._parse_lock = asyncio.Lock()
+    
+    @property
+    def client(self):
+        """Клиент Telethon для работы с Telegram API (создается при первом обращении)"""
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    # Проверяем, настроены ли обязательные параметры
+                    if not config.TELEGRAM_API_ID or not config.TELEGRAM_API_HASH:
+                        logger.error("Необходимо указать TELEGRAM_API_ID и TELEGRAM_API_HASH в .env файле")
+                        raise ValueError("TELEGRAM_API_ID и TELEGRAM_API_HASH не заданы")
+                    
+                    from telethon import TelegramClient
+                    
+                    self._client = TelegramClient('news_parser_session',
+                                                  config.TELEGRAM_API_ID,
+                                                  config.TELEGRAM_API_HASH)
+        return self._client
+    
+    @property
+    def entities(self):
+        """Разрешенные группы-источники (id + access_hash), чтобы не запрашивать их каждый цикл"""
+        if self._entities is None:
+            from .entity_cache import EntityCache
+            self._entities = EntityCache(self.client, os.path.join(config.DATA_DIR, "entities.json"))
+        return self._entities
+    
+    @property
+    def is_parsing(self):
+        return self._parse_lock.locked()
     
     async def start(self):
         """Запускает клиент Telethon"""
@@ -28,72 +116,234 @@ class NewsParser:
         # Информация о пользователе
         me = await self.client.get_me()
         logger.info(f"Авторизован как: {me.first_name} (@{me.username})")
+        
+        await self.load_dedup_index()
+        
+        if config.PARSER_STREAMING:
+            await self.start_streaming()
+    
+    async def start_streaming(self):
+        """Подписывается на новые сообщения в группах-источниках"""
+        if not config.SOURCE_GROUPS:
+            return
+        
+        from telethon import events, utils
+        
+        peers = []
+        for group in config.SOURCE_GROUPS:
+            try:
+                peer = await self.entities.get(group)
+                self._group_names[utils.get_peer_id(peer)] = group
+                peers.append(peer)
+            except Exception as e:
+                logger.error(f"Не удалось подписаться на группу {group}: {e}")
+        
+        if not peers:
+            return
+        
+        self.pipeline.start()
+        self.client.add_event_handler(
+            self._on_new_message,
+            events.NewMessage(chats=peers)
+        )
+        logger.info(f"Получение новостей в реальном времени включено для {len(self._group_names)} групп")
+    
+    async def _on_new_message(self, event):
+        """Обработчик нового сообщения в группе-источнике"""
+        group = self._group_names.get(event.chat_id)
+        if group is None:
+            return
+        
+        # Если очереди конвейера заполнены, ожидание здесь притормаживает прием обновлений
+        await self.pipeline.submit(NewsItem(group, event.message.id, event.message.text))
     
-    async def fetch_recent_messages(self, group_name, hours_ago=24):
+    async def load_dedup_index(self):
+        """Загружает индекс дубликатов из файла или строит его по базе данных"""
+        if self.dedup.load():
+            logger.info(f"Индекс дубликатов загружен: {len(self.dedup)} записей")
+            return
+        
+        articles = await async_db.get_recent_articles(limit=config.DEDUP_MAX_ENTRIES)
+        await asyncio.to_thread(self.dedup.rebuild, articles)
+        self.dedup.save()
+        logger.info(f"Индекс дубликатов построен по базе данных: {len(self.dedup)} записей")
+    
+    async def fetch_recent_messages(self, group_name, hours_ago=None):
         """
-        Получает сообщения из указанной группы за последние N часов
+        Получает новые сообщения из указанной группы: только те, что появились
+        после последнего обработанного сообщения, но не старше N часов
         
         Args:
             group_name (str): Название группы (например, @group_name)
-            hours_ago (int): Количество часов назад для поиска сообщений
+            hours_ago (int): Максимальный возраст сообщений в часах
         
         Returns:
-            list: Список найденных сообщений
+            list: Список найденных сообщений, от старых к новым
         """
-        try:
-            entity = await self.client.get_entity(group_name)
-            
-            # Определяем время для фильтрации сообщений
-            since_time = datetime.now() - timedelta(hours=hours_ago)
-            
-            # Получаем сообщения из группы
-            messages = await self.client.get_messages(
-                entity=entity,
-                limit=20,  # ограничиваем количество сообщений
-                offset_date=since_time
-            )
-            
-            logger.info(f"Получено {len(messages)} сообщений из {group_name}")
-            return messages
+        if hours_ago is None:
+            hours_ago = config.PARSER_BACKFILL_HOURS
+        from telethon.errors import FloodWaitError
+        
+        last_seen_id = self.high_water_marks.get(group_name, 0)
+        resolved = False
+        
+        for _ in range(config.PARSER_FLOOD_WAIT_RETRIES + 1):
+            # Если Telegram уже ответил FloodWait на другой запрос, ждем его окончания
+            await self._wait_flood()
             
-        except Exception as e:
-            logger.error(f"Ошибка при получении сообщений из {group_name}: {e}")
-            return []
+            try:
+                entity = await self.entities.get(group_name)
+                
+                # Определяем время для фильтрации сообщений
+                since_time = datetime.now() - timedelta(hours=hours_ago)
+                
+                # Получаем сообщения новее последнего обработанного, постранично от старых к новым
+                messages = []
+                with TELETHON_FETCH_SECONDS.time():
+                    async for message in self.client.iter_messages(
+                        entity,
+                        min_id=last_seen_id,
+                        offset_date=since_time,
+                        reverse=True,
+                        limit=config.PARSER_MAX_MESSAGES_PER_GROUP
+                    ):
+                        messages.append(message)
+                
+                logger.info(f"Получено {len(messages)} новых сообщений из {group_name}")
+                return messages
+                
+            except FloodWaitError as e:
+                logger.warning(f"FloodWait {e.seconds} с при получении сообщений из {group_name}")
+                self._flood_wait_until = max(
+                    self._flood_wait_until,
+                    asyncio.get_running_loop().time() + e.seconds
+                )
+                
+            except Exception as e:
+                if resolved:
+                    logger.error(f"Ошибка при получении сообщений из {group_name}: {e}")
+                    return []
+                # Сохраненный пир мог устареть: разрешаем имя группы заново и повторяем
+                logger.warning(f"Ошибка при получении сообщений из {group_name} ({e}), обновляем данные группы")
+                self.entities.invalidate(group_name)
+                resolved = True
+        
+        logger.error(f"Не удалось получить сообщения из {group_name}: превышено число попыток после FloodWait")
+        return []
+    
+    async def _wait_flood(self):
+        """Ожидание окончания FloodWait, общего для всех запросов клиента"""
+        delay = self._flood_wait_until - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
     
     async def process_message(self, message, source_group):
         """
-        Обрабатывает отдельное сообщение и сохраняет его в базу данных
+        Передает сообщение в конвейер обработки
         
         Args:
             message: Объект сообщения из Telethon
             source_group (str): Название исходной группы
         """
-        try:
-            # Проверяем, есть ли текст в сообщении
-            if not message.text:
-                return
-            
-            # Проверяем минимальную длину сообщения (чтобы не обрабатывать короткие сообщения)
-            if len(message.text.strip()) < 50:
-                return
-            
-            # Сохраняем оригинальное сообщение в базу данных
-            article_id = db.add_news_article(
-                source_group=source_group,
-                original_content=message.text,
-                source_message_id=message.id
-            )
-            
-            # Перефразируем контент с помощью Gemini
-            processed_content = await gemini_helper.rewrite_content(message.text)
-            
-            # Обновляем обработанный контент в базе данных
-            db.update_processed_content(article_id, processed_content)
-            
-            logger.info(f"Сообщение ID {message.id} из {source_group} успешно обработано (ID статьи: {article_id})")
-            
-        except Exception as e:
-            logger.error(f"Ошибка при обработке сообщения из {source_group}: {e}")
+        await self.pipeline.submit(NewsItem(source_group, message.id, message.text))
+    
+    async def _filter_stage(self, item):
+        """Стадия фильтрации: отбрасывает сообщения без текста и слишком короткие"""
+        NEWS_INGESTED.inc()
+        text = item.text
+        
+        # Проверяем, есть ли текст в сообщении
+        if not text:
+            return None
+        
+        # Проверяем минимальную длину сообщения (чтобы не обрабатывать короткие сообщения)
+        if len(text.strip()) < 50:
+            return None
+        
+        # Отсеиваем уже сохраненные сообщения и репосты до обращения к Gemini
+        if self.dedup.seen_source(item.source_group, item.message_id):
+            logger.debug(f"Сообщение ID {item.message_id} из {item.source_group} уже обработано")
+            NEWS_DEDUPLICATED.inc()
+            return None
+        
+        duplicate = self.dedup.find_duplicate(text)
+        if duplicate:
+            # На уровне INFO с началом текста, чтобы ошибочный отсев было видно в логах
+            preview = " ".join(text.split())[:80]
+            logger.info(f"Сообщение ID {item.message_id} из {item.source_group} пропущено как дубликат ({duplicate}): {preview}")
+            self.dedup.add(item.source_group, item.message_id, text)
+            NEWS_DEDUPLICATED.inc()
+            return None
+        
+        # Запись в индексе занимает текст сразу, чтобы копии, идущие по конвейеру
+        # одновременно, не ушли в Gemini; если сообщение не сохранится, запись снимается
+        self.dedup.add(item.source_group, item.message_id, text)
+        return item
+    
+    def _retry_or_drop(self, item, reason):
+        """
+        Сообщение, не прошедшее перефразирование или сохранение: повторяется в
+        следующем цикле, а после PARSER_REWRITE_MAX_ATTEMPTS попыток убирается
+        из индекса дубликатов, чтобы не отсеивать его повторы и репосты
+        """
+        item.attempts += 1
+        if item.attempts < config.PARSER_REWRITE_MAX_ATTEMPTS:
+            logger.warning(f"Сообщение ID {item.message_id} из {item.source_group} поставлено на повтор: {reason} (попытка {item.attempts})")
+            self.retry_queue.append(item)
+            self._save_retry_queue()
+        else:
+            logger.error(f"Сообщение ID {item.message_id} из {item.source_group} пропущено: {reason} за {item.attempts} попыток")
+            self.dedup.discard(item.source_group, item.message_id, item.text)
+    
+    async def _rewrite_stage(self, items):
+        """Стадия перефразирования контента с помощью Gemini (пакетами)"""
+        rewritten = await gemini_helper.rewrite_batch([item.text for item in items])
+        
+        results = []
+        for item, processed_content in zip(items, rewritten):
+            item.processed_content = processed_content
+            if processed_content is None:
+                # Ошибку не сохраняем как контент: сообщение уходит в очередь повторов
+                self._retry_or_drop(item, "не удалось перефразировать")
+                results.append(None)
+            else:
+                stats.record_rewrite_latency(time.monotonic() - item.received_at)
+                NEWS_REWRITTEN.inc()
+                results.append(item)
+        return results
+    
+    async def _persist_stage(self, item):
+        """Стадия сохранения статьи в базу данных"""
+        article_id = await async_db.add_news_article(
+            source_group=item.source_group,
+            original_content=item.text,
+            source_message_id=item.message_id
+        )
+        if article_id is None:
+            # Повтор пройдет перефразирование заново (ответ возьмется из кэша) и сохранение
+            self._retry_or_drop(item, "не удалось сохранить")
+            return None
+        
+        await async_db.update_processed_content(article_id, item.processed_content)
+        
+        logger.info(f"Сообщение ID {item.message_id} из {item.source_group} успешно обработано (ID статьи: {article_id})")
+        return None
+    
+    async def _parse_group(self, group):
+        """
+        Получает новые сообщения группы и передает их в конвейер
+        
+        Returns:
+            int: ID самого нового полученного сообщения или None
+        """
+        async with self._fetch_semaphore:
+            logger.info(f"Начинаем парсинг группы {group}")
+            messages = await self.fetch_recent_messages(group)
+        
+        for message in messages:
+            await self.process_message(message, group)
+        
+        return max((message.id for message in messages), default=None)
     
     async def parse_all_sources(self):
         """
@@ -103,16 +353,43 @@ class NewsParser:
             logger.warning("Список SOURCE_GROUPS пуст. Нет источников для парсинга.")
             return
         
-        for group in config.SOURCE_GROUPS:
-            logger.info(f"Начинаем парсинг группы {group}")
-            messages = await self.fetch_recent_messages(group)
-            
-            # Обрабатываем каждое сообщение
-            for message in messages:
-                await self.process_message(message, group)
-            
-            # Небольшая пауза между обработкой разных групп
-            await asyncio.sleep(5)
+        async with self._parse_lock:
+            await self._parse_all_sources()
+    
+    async def _parse_all_sources(self):
+        """Один цикл парсинга всех источников (выполняется под блокировкой)"""
+        self.pipeline.start()
+        
+        # Сначала повторяем перефразирование сообщений, не обработанных в прошлых циклах
+        retries, self.retry_queue = self.retry_queue, []
+        for item in retries:
+            await self.pipeline.submit(item, stage="rewrite")
+        
+        # Группы опрашиваются параллельно, обработка идет по мере получения сообщений
+        last_ids = await asyncio.gather(*(self._parse_group(group) for group in config.SOURCE_GROUPS))
+        
+        # Дожидаемся, пока все сообщения пройдут конвейер
+        await self.pipeline.join()
+        
+        # Сдвигаем курсоры только после обработки: сообщения, которые не удалось
+        # перефразировать или сохранить, к этому моменту уже в очереди повторов
+        new_marks = {
+            group: last_id
+            for group, last_id in zip(config.SOURCE_GROUPS, last_ids)
+            if last_id is not None and last_id > self.high_water_marks.get(group, 0)
+        }
+        if new_marks:
+            self.high_water_marks.update(new_marks)
+        
+        self.dedup.save()
+        self._save_retry_queue()
+        
+        cache_stats = gemini_helper.cache.stats()
+        logger.info(f"Кэш перефразирования: попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}")
+    
+    def _save_retry_queue(self):
+        """Сохраняет очередь повторов на диск, чтобы она пережила перезапуск"""
+        self.retry_store.set("items", [item.to_dict() for item in self.retry_queue])
     
     async def run_periodic_parsing(self):
         """
@@ -120,7 +397,10 @@ class NewsParser:
         """
         while True:
             try:
-                logger.info("Начинаем плановый парсинг источников")
+                if config.PARSER_STREAMING:
+                    logger.info("Догружаем сообщения, пропущенные потоком реального времени")
+                else:
+                    logger.info("Начинаем плановый парсинг источников")
                 await self.parse_all_sources()
                 
                 # Ждем заданный интервал перед следующим парсингом
@@ -134,9 +414,19 @@ class NewsParser:
                 await asyncio.sleep(300)  # 5 минут
     
     async def stop(self):
-        """Останавливает клиент Telethon"""
-        await self.client.disconnect()
-        logger.info("Telegram клиент остановлен")
+        """Останавливает конвейер обработки и клиент Telethon"""
+        await self.pipeline.stop()
+        self.dedup.save()
+        self._save_retry_queue()
+        if self._client is not None:
+            await self._client.disconnect()
+            logger.info("Telegram клиент остановлен")
 
 # Создание экземпляра парсера новостей
-news_parser = NewsParser() 
\ No newline at end of file
+news_parser = NewsParser()
+
+# Глубина очередей парсера для /metrics
+registry.gauge("pipeline_queue_size", "Сообщения в очередях стадий конвейера", ("stage",),
+               func=lambda: {(name,): size for name, size in news_parser.pipeline.queue_sizes().items()})
+registry.gauge("rewrite_retry_queue_size", "Сообщения, ожидающие повторного перефразирования",
+               func=lambda: len(news_parser.retry_queue)) 
\ No newline at end of file
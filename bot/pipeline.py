@@ -0,0 +1,139 @@
+import asyncio
+from loguru import logger
+
+
+class PipelineStage:
+    """
+    Стадия конвейера: асинхронный обработчик и число параллельных воркеров.
+
+    Обработчик получает элемент и возвращает его (или новый элемент) для передачи
+    на следующую стадию, либо None, если элемент нужно отбросить.
+
+    Если batch_size > 1, обработчик получает список из не более batch_size
+    элементов (воркер ждет накопления пакета до batch_wait секунд) и возвращает
+    список результатов той же длины.
+    """
+
+    def __init__(self, name, handler, concurrency=1, batch_size=1, batch_wait=0.0):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+
+
+class Pipeline:
+    """
+    Многостадийный асинхронный конвейер с ограниченными очередями между стадиями.
+
+    Каждая стадия обслуживается своим пулом воркеров, поэтому время обработки
+    определяется самой медленной стадией, а не суммой всех. Очереди ограничены
+    по размеру, так что при перегрузке submit() ждет (обратное давление).
+
+    Необязательный on_done(item) вызывается, когда элемент покидает конвейер:
+    прошел последнюю стадию, был отброшен или вызвал ошибку.
+    """
+
+    def __init__(self, stages, queue_size=100, on_done=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_done = on_done
+        self._queues = []
+        self._workers = []
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    def start(self):
+        """Запуск воркеров всех стадий"""
+        if self.running:
+            return
+
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.concurrency):
+                self._workers.append(asyncio.create_task(self._worker(index)))
+
+    async def submit(self, item, stage=None):
+        """
+        Передача элемента в конвейер
+
+        Args:
+            item: элемент для обработки
+            stage (str): название стадии, с которой начать (по умолчанию - первая)
+        """
+        self.start()
+        index = 0
+        if stage is not None:
+            index = [s.name for s in self.stages].index(stage)
+        await self._queues[index].put(item)
+
+    async def join(self):
+        """Ожидание, пока все переданные элементы пройдут конвейер"""
+        for queue in self._queues:
+            await queue.join()
+
+    def qsize(self):
+        """Суммарное количество элементов в очередях"""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def queue_sizes(self):
+        """Количество элементов в очереди каждой стадии"""
+        return {stage.name: queue.qsize() for stage, queue in zip(self.stages, self._queues)}
+
+    async def stop(self):
+        """Остановка воркеров"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self, index):
+        stage = self.stages[index]
+        queue = self._queues[index]
+        next_queue = self._queues[index + 1] if index + 1 < len(self._queues) else None
+
+        while True:
+            items = [await queue.get()]
+            try:
+                if stage.batch_size > 1:
+                    await self._fill_batch(stage, queue, items)
+                    results = await stage.handler(items)
+                else:
+                    results = [await stage.handler(items[0])]
+
+                for item, result in zip(items, results):
+                    if result is not None and next_queue is not None:
+                        await next_queue.put(result)
+                    else:
+                        self._done(item)
+            except Exception as e:
+                logger.error(f"Ошибка на стадии '{stage.name}' конвейера: {e}")
+                for item in items:
+                    self._done(item)
+            finally:
+                for _ in items:
+                    queue.task_done()
+
+    def _done(self, item):
+        if self.on_done is None:
+            return
+        try:
+            self.on_done(item)
+        except Exception as e:
+            logger.error(f"Ошибка в обработчике завершения конвейера: {e}")
+
+    async def _fill_batch(self, stage, queue, items):
+        """Добор элементов в пакет: сразу доступные и пришедшие за batch_wait секунд"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + stage.batch_wait
+        while len(items) < stage.batch_size:
+            timeout = deadline - loop.time()
+            try:
+                if timeout <= 0:
+                    items.append(queue.get_nowait())
+                else:
+                    items.append(await asyncio.wait_for(queue.get(), timeout))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
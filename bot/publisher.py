@@ -0,0 +1,284 @@
+import asyncio
+import os
+from datetime import datetime, time, timedelta
+from loguru import logger
+
+from .config import config
+from .db import async_db
+from .json_store import JsonStore
+from .lifecycle import FAILED, PUBLISHABLE, REJECTED, SCHEDULED
+from .metrics import NEWS_PUBLISHED, registry
+from .sender import message_sender
+
+
+def parse_slots(value):
+    """Разбор слотов публикации вида "10:00,14:00,18:00" в список (час, минута)"""
+    slots = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        hour, _, minute = item.partition(":")
+        slots.append((int(hour), int(minute or 0)))
+    return sorted(slots)
+
+
+class PublishQueue:
+    """
+    Очередь публикации одобренных статей.
+
+    Статья в очереди находится в состоянии scheduled (или failed после
+    неудачной попытки); отмена публикации сохраняется в базе как rejected.
+    Неудачная попытка переносит статью в конец очереди, чтобы она не задерживала
+    остальные; после PUBLISH_MAX_ATTEMPTS неудач статья убирается из очереди
+    (ее можно опубликовать вручную из /approved), а администраторы получают
+    уведомление.
+    Порядок очереди и время последней публикации хранятся в JSON-файле и
+    переживают перезапуск. Публикация идет по слотам (PUBLISH_SLOTS) или с
+    заданным интервалом (PUBLISH_INTERVAL_MINUTES). Цикл публикации спит,
+    пока очередь пуста или не наступило время, и просыпается сразу после
+    одобрения новой статьи.
+    """
+
+    def __init__(self, state_path, slots=None, interval_minutes=30, max_attempts=3):
+        self.state = JsonStore(state_path)
+        self.slots = slots or []
+        self.interval = timedelta(minutes=interval_minutes)
+        self.max_attempts = max_attempts
+
+        self._queue = list(self.state.get("queue", []))
+        self._wakeup = asyncio.Event()
+        self._sender = None
+        # Цикл публикации, /api/publish_next и кнопка «опубликовать» не должны
+        # отправить одну статью дважды - публикации выполняются по очереди
+        self._publish_lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def set_sender(self, sender):
+        """Функция отправки текста в целевую группу: async (text) -> bool"""
+        self._sender = sender
+
+    @property
+    def last_published_at(self):
+        value = self.state.get("last_published_at")
+        return datetime.fromisoformat(value) if value else None
+
+    def _save(self):
+        self.state.set("queue", self._queue)
+
+    async def load(self):
+        """Сверка сохраненной очереди с одобренными, но не опубликованными статьями в базе"""
+        articles = await async_db.get_approved_not_posted_articles(limit=config.PUBLISH_QUEUE_MAX_SIZE)
+        # Статьи, исчерпавшие попытки публикации, в очередь не возвращаются
+        attempts = self.state.get("attempts", {})
+        approved_ids = [
+            article_id for article_id, _ in articles
+            if attempts.get(str(article_id), 0) < self.max_attempts
+        ]
+        # Статьи, одобренные, но не поставленные в очередь (например, перед остановкой бота)
+        await async_db.transition_articles(approved_ids, SCHEDULED)
+
+        # Сохраненный порядок важнее, новые статьи из базы добавляются в конец
+        approved = set(approved_ids)
+        queue = [article_id for article_id in self._queue if article_id in approved]
+        queued = set(queue)
+        queue.extend(article_id for article_id in approved_ids if article_id not in queued)
+
+        self._queue = queue
+        self._save()
+        logger.info(f"Очередь публикации загружена: {len(self._queue)} статей")
+
+    async def schedule(self, article_ids):
+        """
+        Перевод одобренных статей в состояние scheduled и постановка в очередь
+
+        Returns:
+            list: ID статей, поставленных в очередь
+        """
+        scheduled = await async_db.transition_articles(article_ids, SCHEDULED)
+        for article_id in scheduled:
+            self._reset_attempts(article_id)
+        self.enqueue_many(scheduled)
+        return scheduled
+
+    async def cancel(self, article_id):
+        """Отмена публикации: статья отклоняется в базе и убирается из очереди"""
+        cancelled = await async_db.transition_articles([article_id], REJECTED)
+        self.remove(article_id)
+        self._reset_attempts(article_id)
+        return bool(cancelled)
+
+    def enqueue_many(self, article_ids):
+        """Добавление статей в очередь с одним сохранением и пробуждение цикла публикации"""
+        queued = set(self._queue)
+        added = False
+        for article_id in article_ids:
+            article_id = int(article_id)
+            if article_id not in queued:
+                self._queue.append(article_id)
+                queued.add(article_id)
+                added = True
+        if added:
+            self._save()
+        self._wakeup.set()
+
+    def remove(self, article_id):
+        """Удаление статьи из очереди"""
+        article_id = int(article_id)
+        if article_id in self._queue:
+            self._queue.remove(article_id)
+            self._save()
+            self._wakeup.set()
+            return True
+        return False
+
+    def next_publish_time(self):
+        """Время, когда можно опубликовать следующую статью"""
+        last = self.last_published_at
+        now = datetime.now()
+
+        if self.slots:
+            # Ближайший слот после последней публикации; пропущенный слот публикуется сразу,
+            # но не больше одного за раз
+            return self._next_slot(last or now)
+
+        if last is None:
+            return now
+        return last + self.interval
+
+    def _next_slot(self, after):
+        for day_offset in range(8):
+            day = (after + timedelta(days=day_offset)).date()
+            for hour, minute in self.slots:
+                slot = datetime.combine(day, time(hour, minute))
+                if slot > after:
+                    return slot
+        return after + timedelta(days=1)
+
+    async def publish_next(self):
+        """
+        Публикует первую статью из очереди без учета расписания
+
+        Returns:
+            tuple: (ID статьи или None, если очередь пуста; признак успеха)
+        """
+        if not self._queue:
+            return None, False
+
+        article_id = self._queue[0]
+        success = await self.publish_article(article_id)
+        return article_id, success
+
+    async def publish_article(self, article_id):
+        """Публикует статью по ID и отмечает ее как опубликованную"""
+        async with self._publish_lock:
+            return await self._publish_article(int(article_id))
+
+    async def _publish_article(self, article_id):
+        # Состояние читается уже под блокировкой: параллельная публикация этой
+        # статьи успела отметить ее как posted
+        article = await async_db.get_article_by_id(article_id)
+        if not article or article["state"] not in PUBLISHABLE:
+            # Статья удалена, уже опубликована или публикация отменена - убираем из очереди
+            self.remove(article_id)
+            self._reset_attempts(article_id)
+            return False
+
+        if self._sender is None:
+            logger.error("Функция отправки для очереди публикации не задана")
+            return False
+
+        if not await self._sender(article["processed_content"]):
+            logger.error(f"Не удалось опубликовать новость ID {article_id}")
+            await async_db.transition_articles([article_id], FAILED)
+            await self._publish_failed(article_id)
+            return False
+
+        await async_db.mark_as_posted(article_id)
+        if article_id in self._queue:
+            self._queue.remove(article_id)
+        attempts = self.state.get("attempts", {})
+        attempts.pop(str(article_id), None)
+        self.state.update({
+            "queue": self._queue,
+            "attempts": attempts,
+            "last_published_at": datetime.now().isoformat(),
+        })
+        NEWS_PUBLISHED.inc()
+        logger.info(f"Новость ID {article_id} успешно опубликована")
+        return True
+
+    async def _publish_failed(self, article_id):
+        """
+        Учет неудачной попытки: статья переносится в конец очереди, а после
+        max_attempts неудач убирается из нее с уведомлением администраторов
+        """
+        attempts = self.state.get("attempts", {})
+        count = attempts.get(str(article_id), 0) + 1
+        attempts[str(article_id)] = count
+
+        if article_id in self._queue:
+            self._queue.remove(article_id)
+        if count < self.max_attempts:
+            # Остальные статьи публикуются, пока эта ждет следующей попытки
+            self._queue.append(article_id)
+        self.state.update({"queue": self._queue, "attempts": attempts})
+        if count < self.max_attempts:
+            return
+
+        logger.error(f"Новость ID {article_id} не опубликована после {count} попыток и убрана из очереди")
+        await message_sender.broadcast(
+            config.ADMIN_USER_IDS,
+            f"⚠️ Новость ID {article_id} не удалось опубликовать после {count} попыток, "
+            f"она убрана из очереди публикации. Опубликовать ее вручную или отменить "
+            f"публикацию можно в /approved."
+        )
+
+    def _reset_attempts(self, article_id):
+        attempts = self.state.get("attempts", {})
+        if attempts.pop(str(article_id), None) is not None:
+            self.state.set("attempts", attempts)
+
+    async def run(self):
+        """Цикл публикации: ждет появления статей и наступления времени публикации"""
+        while True:
+            try:
+                self._wakeup.clear()
+
+                if not self._queue:
+                    await self._wakeup.wait()
+                    continue
+
+                delay = (self.next_publish_time() - datetime.now()).total_seconds()
+                if delay > 0:
+                    try:
+                        # Новое одобрение или изменение очереди прерывает ожидание
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                _, success = await self.publish_next()
+                if not success:
+                    # Не долбим Telegram при ошибке отправки
+                    await asyncio.sleep(config.PUBLISH_RETRY_DELAY_SECONDS)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка в процессе публикации новостей: {e}")
+                await asyncio.sleep(config.PUBLISH_RETRY_DELAY_SECONDS)
+
+
+# Создание экземпляра очереди публикации
+publish_queue = PublishQueue(
+    os.path.join(config.DATA_DIR, "publish_queue.json"),
+    slots=parse_slots(config.PUBLISH_SLOTS),
+    interval_minutes=config.PUBLISH_INTERVAL_MINUTES,
+    max_attempts=config.PUBLISH_MAX_ATTEMPTS
+)
+
+# Глубина очереди публикации для /metrics
+registry.gauge("publish_queue_size", "Статьи в очереди публикации", func=lambda: len(publish_queue))
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rewrites (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rewrites_last_used ON rewrites (last_used_at);
+"""
+
+
+def rewrite_key(prompt_version, text):
+    """Ключ кэша: хэш версии шаблона промпта и входного текста"""
+    return hashlib.sha256(f"{prompt_version}\n{text}".encode("utf-8")).hexdigest()
+
+
+class RewriteCache:
+    """
+    Постоянный кэш перефразированных текстов в SQLite.
+
+    Записи старше max_age_seconds удаляются, а при превышении max_entries
+    вытесняются давно не использованные. Счетчики попаданий и промахов
+    доступны через hits/misses. Методы синхронные: из асинхронного кода их
+    вызывают через asyncio.to_thread, чтобы запросы и фиксация транзакций не
+    блокировали цикл событий.
+    """
+
+    # Как часто (в количестве записей) запускать очистку
+    EVICT_EVERY = 100
+
+    def __init__(self, path, max_entries=5000, max_age_seconds=30 * 24 * 3600):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.evict()
+
+    def get(self, key):
+        """Получение перефразированного текста по ключу или None"""
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """Перефразированные тексты по ключам (None для отсутствующих) в одной транзакции"""
+        now = time.time()
+        results = []
+        try:
+            with self._lock:
+                self.conn.execute("BEGIN")
+                try:
+                    for key in keys:
+                        row = self.conn.execute(
+                            "SELECT content FROM rewrites WHERE key = ? AND created_at >= ?",
+                            (key, now - self.max_age_seconds)
+                        ).fetchone()
+                        if row is not None:
+                            self.conn.execute("UPDATE rewrites SET last_used_at = ? WHERE key = ?", (now, key))
+                        results.append(row[0] if row is not None else None)
+                    self.conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self.conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка чтения кэша перефразирования: {e}")
+            results = [None] * len(keys)
+
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put(self, key, content):
+        """Сохранение перефразированного текста"""
+        self.put_many([(key, content)])
+
+    def put_many(self, items):
+        """Сохранение нескольких перефразированных текстов [(ключ, текст), ...] одной транзакцией"""
+        if not items:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self.conn.execute("BEGIN")
+                try:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO rewrites (key, content, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                        [(key, content, now, now) for key, content in items]
+                    )
+                    self.conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self.conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка записи в кэш перефразирования: {e}")
+            return
+
+        before = self._puts
+        self._puts += len(items)
+        if self._puts // self.EVICT_EVERY != before // self.EVICT_EVERY:
+            self.evict()
+
+    def evict(self):
+        """Удаление устаревших записей и вытеснение лишних по давности использования"""
+        try:
+            with self._lock:
+                self.conn.execute(
+                    "DELETE FROM rewrites WHERE created_at < ?",
+                    (time.time() - self.max_age_seconds,)
+                )
+                self.conn.execute(
+                    "DELETE FROM rewrites WHERE key IN ("
+                    "SELECT key FROM rewrites ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка очистки кэша перефразирования: {e}")
+
+    def stats(self):
+        """Счетчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
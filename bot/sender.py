@@ -0,0 +1,237 @@
+import asyncio
+import re
+from collections import OrderedDict
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from loguru import logger
+
+from .config import config
+from .llm_scheduler import TokenBucket
+from .metrics import TELEGRAM_SEND_ERRORS, TELEGRAM_SEND_SECONDS
+
+# Максимальная длина текста сообщения в Telegram
+MESSAGE_LIMIT = 4096
+
+# HTML-теги и сущности (&amp;, &#39;) - их нельзя разрезать при делении текста
+_HTML_TOKEN_RE = re.compile(r"(<[^>]+>|&#?\w+;)")
+_TAG_NAME_RE = re.compile(r"</?\s*([a-zA-Z0-9-]+)")
+
+
+def _cut_position(text, limit):
+    """Позиция разреза текста по абзацу, строке или пробелу во второй половине лимита (или None)"""
+    for separator in ("\n\n", "\n", " "):
+        position = text.rfind(separator, limit // 2, limit)
+        if position != -1:
+            return position + len(separator)
+    return None
+
+
+def split_html(text, limit=MESSAGE_LIMIT):
+    """
+    Деление HTML-текста на части не длиннее limit символов
+
+    Текст режется по абзацам, строкам или пробелам; теги и HTML-сущности не
+    разрезаются, а незакрытые на границе части теги закрываются в конце части
+    и открываются заново в начале следующей.
+
+    Returns:
+        list: части текста
+    """
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    stack = []  # открытые теги: (имя, открывающий тег)
+    current = ""
+
+    def opening():
+        return "".join(tag for _, tag in stack)
+
+    def closing():
+        return "".join(f"</{name}>" for name, _ in reversed(stack))
+
+    def flush():
+        nonlocal current
+        if current.strip() and current != opening():
+            chunks.append(current + closing())
+        current = opening()
+
+    for token in _HTML_TOKEN_RE.split(text):
+        if not token:
+            continue
+
+        if token.startswith("<"):
+            match = _TAG_NAME_RE.match(token)
+            name = match.group(1).lower() if match else ""
+            is_closing = token.startswith("</")
+            # Для открывающего тега сразу резервируем место под его закрытие
+            reserve = 0 if is_closing else len(name) + 3
+            if len(current) + len(token) + reserve + len(closing()) > limit:
+                flush()
+            current += token
+            if is_closing:
+                for index in range(len(stack) - 1, -1, -1):
+                    if stack[index][0] == name:
+                        del stack[index]
+                        break
+            elif name:
+                stack.append((name, token))
+            continue
+
+        if token.startswith("&") and token.endswith(";"):
+            if len(current) + len(token) + len(closing()) > limit:
+                flush()
+            current += token
+            continue
+
+        while token:
+            room = limit - len(current) - len(closing())
+            if len(token) <= room:
+                current += token
+                break
+            position = _cut_position(token, room) if room > 0 else None
+            if position is None:
+                if current != opening():
+                    # Лучше начать новую часть, чем резать слово посередине
+                    flush()
+                    continue
+                position = max(1, room)
+            current += token[:position]
+            token = token[position:]
+            flush()
+
+    flush()
+    return chunks
+
+
+class MessageSender:
+    """
+    Отправка сообщений ботом с учетом лимитов Telegram.
+
+    Соблюдает общий лимит бота (TELEGRAM_GLOBAL_RATE_PER_SECOND) и лимиты на
+    отдельный чат (TELEGRAM_GROUP_RATE_PER_MINUTE для групп и каналов,
+    TELEGRAM_CHAT_RATE_PER_MINUTE для личных чатов), ждет указанное Telegram
+    время после TelegramRetryAfter, делит длинные тексты на части и рассылает
+    одно сообщение в несколько чатов параллельно. Если длинный текст отправлен
+    не полностью, повторная отправка того же текста в тот же чат продолжается
+    с первой недоставленной части.
+    """
+
+    # Допустимый всплеск сообщений в один чат
+    CHAT_BURST = 3
+    # Сколько частично отправленных текстов помнить для продолжения отправки
+    PARTIAL_MAX = 100
+
+    def __init__(self, bot=None, global_rate_per_second=30, group_rate_per_minute=20,
+                 chat_rate_per_minute=60, max_retries=3):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate_per_second * 60, capacity=global_rate_per_second)
+        self.group_rate = group_rate_per_minute
+        self.chat_rate = chat_rate_per_minute
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._locks = {}
+        # (ID чата, текст) -> число уже доставленных частей
+        self._partial = OrderedDict()
+
+    def set_bot(self, bot):
+        """Бот, от имени которого отправляются сообщения"""
+        self.bot = bot
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            # У групп и каналов отрицательные ID
+            rate = self.group_rate if int(chat_id) < 0 else self.chat_rate
+            bucket = self._buckets[chat_id] = TokenBucket(rate, capacity=min(rate, self.CHAT_BURST))
+        return bucket
+
+    def _chat_lock(self, chat_id):
+        lock = self._locks.get(chat_id)
+        if lock is None:
+            lock = self._locks[chat_id] = asyncio.Lock()
+        return lock
+
+    async def send(self, chat_id, text, reply_markup=None, **kwargs):
+        """
+        Отправка текста в чат; длинный текст отправляется несколькими сообщениями,
+        клавиатура прикрепляется к последнему
+
+        Части, доставленные при прошлой неудачной отправке того же текста в этот
+        чат, повторно не отправляются.
+
+        Returns:
+            bool: True, если отправлены все части
+        """
+        chunks = split_html(text)
+        key = (chat_id, text)
+        # Части одного текста не перемешиваются с другими сообщениями в этот чат
+        async with self._chat_lock(chat_id):
+            delivered = self._partial.pop(key, 0)
+            for index in range(delivered, len(chunks)):
+                markup = reply_markup if index == len(chunks) - 1 else None
+                if await self._send_chunk(chat_id, chunks[index], reply_markup=markup, **kwargs) is None:
+                    if index:
+                        self._remember_partial(key, index)
+                    return False
+        return True
+
+    def _remember_partial(self, key, delivered):
+        """Запоминание числа доставленных частей текста для следующей попытки"""
+        self._partial[key] = delivered
+        self._partial.move_to_end(key)
+        while len(self._partial) > self.PARTIAL_MAX:
+            self._partial.popitem(last=False)
+        logger.warning(
+            f"Чат {key[0]}: доставлено {delivered} частей сообщения, "
+            f"повторная отправка продолжится со следующей"
+        )
+
+    async def broadcast(self, chat_ids, text, **kwargs):
+        """
+        Параллельная отправка текста в несколько чатов
+
+        Returns:
+            dict: {ID чата: признак успешной отправки}
+        """
+        chat_ids = list(dict.fromkeys(chat_ids))
+        results = await asyncio.gather(*(self.send(chat_id, text, **kwargs) for chat_id in chat_ids))
+        return dict(zip(chat_ids, results))
+
+    async def _send_chunk(self, chat_id, text, **kwargs):
+        """Отправка одного сообщения с ожиданием лимитов и повторами; возвращает Message или None"""
+        for attempt in range(self.max_retries + 1):
+            # Сначала лимит чата, чтобы ожидание медленного чата не занимало общий лимит
+            await self._chat_bucket(chat_id).acquire(1)
+            await self.global_bucket.acquire(1)
+            try:
+                with TELEGRAM_SEND_SECONDS.time():
+                    return await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            except TelegramRetryAfter as e:
+                TELEGRAM_SEND_ERRORS.inc(reason="retry_after")
+                if attempt == self.max_retries:
+                    logger.error(f"Чат {chat_id}: превышен лимит Telegram, попытки исчерпаны")
+                    return None
+                logger.warning(f"Чат {chat_id}: превышен лимит Telegram, повтор через {e.retry_after} с")
+                await asyncio.sleep(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                TELEGRAM_SEND_ERRORS.inc(reason="network")
+                if attempt == self.max_retries:
+                    logger.error(f"Ошибка при отправке сообщения в чат {chat_id}: {e}")
+                    return None
+                delay = 2 ** attempt
+                logger.warning(f"Ошибка при отправке сообщения в чат {chat_id} ({e}), повтор через {delay} с")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                TELEGRAM_SEND_ERRORS.inc(reason="other")
+                logger.error(f"Ошибка при отправке сообщения в чат {chat_id}: {e}")
+                return None
+        return None
+
+
+# Создание экземпляра отправителя (бот задается при запуске)
+message_sender = MessageSender(
+    global_rate_per_second=config.TELEGRAM_GLOBAL_RATE_PER_SECOND,
+    group_rate_per_minute=config.TELEGRAM_GROUP_RATE_PER_MINUTE,
+    chat_rate_per_minute=config.TELEGRAM_CHAT_RATE_PER_MINUTE,
+    max_retries=config.TELEGRAM_SEND_MAX_RETRIES
+)
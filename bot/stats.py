@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from .lifecycle import PUBLISHABLE, STATES
+from .metrics import registry
+
+
+def _percentile(values, fraction):
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class BotStats:
+    """
+    Статистика бота, обновляемая при каждой записи.
+
+    Хранилище статей сообщает о добавлении статей и смене их статуса, конвейер
+    парсинга - о времени перефразирования. Счетчики по статусам, источникам и
+    дням считаются один раз при загрузке базы и дальше меняются инкрементально,
+    поэтому /status не перечитывает статьи.
+    """
+
+    # Статусы - состояния жизненного цикла статьи (bot.lifecycle)
+    STATUSES = STATES
+
+    # Окно для скорости поступления статей и число хранимых замеров времени перефразирования
+    INGEST_WINDOW_SECONDS = 3600
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_status = Counter()
+        self.by_source = Counter()
+        self.by_day = Counter()
+        self._ingested = deque()
+        self._latencies = deque(maxlen=self.LATENCY_SAMPLES)
+
+    def load(self, articles):
+        """
+        Начальный подсчет по статьям из базы
+
+        Args:
+            articles: итерируемое из (статус, source_group, created_at, количество)
+        """
+        by_status, by_source, by_day = Counter(), Counter(), Counter()
+        for status, source_group, created_at, count in articles:
+            by_status[status] += count
+            by_source[source_group] += count
+            by_day[str(created_at)[:10]] += count
+
+        with self._lock:
+            self.by_status, self.by_source, self.by_day = by_status, by_source, by_day
+
+    def article_added(self, status, source_group, created_at):
+        """Учет новой статьи"""
+        now = time.monotonic()
+        with self._lock:
+            self.by_status[status] += 1
+            self.by_source[source_group] += 1
+            self.by_day[str(created_at)[:10]] += 1
+            self._ingested.append(now)
+            self._trim_ingested(now)
+
+    def articles_archived(self, articles):
+        """
+        Учет статей, перенесенных в архив: статистика считается по активным статьям
+
+        Args:
+            articles: итерируемое из (статус, source_group, created_at, количество)
+        """
+        with self._lock:
+            for status, source_group, created_at, count in articles:
+                self.by_status[status] -= count
+                self.by_source[source_group] -= count
+                self.by_day[str(created_at)[:10]] -= count
+            # Источники и дни, целиком ушедшие в архив, не показываются
+            self.by_source = +self.by_source
+            self.by_day = +self.by_day
+
+    def status_changed(self, old_status, new_status):
+        """Учет смены статуса статьи"""
+        if old_status == new_status:
+            return
+        with self._lock:
+            self.by_status[old_status] -= 1
+            self.by_status[new_status] += 1
+
+    def record_rewrite_latency(self, seconds):
+        """Время от получения сообщения до готового перефразированного текста"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _trim_ingested(self, now):
+        while self._ingested and now - self._ingested[0] > self.INGEST_WINDOW_SECONDS:
+            self._ingested.popleft()
+
+    def snapshot(self, top_sources=5, days=7):
+        """
+        Текущие значения статистики
+
+        Returns:
+            dict: счетчики по статусам, источникам и дням, скорость поступления,
+            перцентили времени перефразирования и очередь публикации
+        """
+        today = datetime.utcnow().date()
+        with self._lock:
+            self._trim_ingested(time.monotonic())
+            by_status = {status: self.by_status[status] for status in self.STATUSES}
+            sources = dict(self.by_source.most_common(top_sources))
+            by_day = {}
+            for offset in range(days):
+                day = (today - timedelta(days=offset)).isoformat()
+                by_day[day] = self.by_day[day]
+            ingested_last_hour = len(self._ingested)
+            latencies = sorted(self._latencies)
+
+        return {
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "by_source": sources,
+            "by_day": by_day,
+            "ingested_last_hour": ingested_last_hour,
+            "rewrite_latency": {
+                "samples": len(latencies),
+                "p50": _percentile(latencies, 0.5),
+                "p90": _percentile(latencies, 0.9),
+                "p99": _percentile(latencies, 0.99),
+            },
+            "publish_backlog": sum(by_status[status] for status in PUBLISHABLE),
+        }
+
+
+# Создание экземпляра статистики
+stats = BotStats()
+
+# Количество статей по статусам для /metrics
+registry.gauge("articles", "Статьи в хранилище по статусам", ("status",),
+               func=lambda: {(status,): count for status, count in stats.snapshot()["by_status"].items()})
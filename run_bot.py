@@ -1,15 +1,26 @@
 #!/usr/bin/env python
 """
 Точка входа для запуска бота
+
+Флаг --startup-profile выводит время импорта и инициализации компонентов
+и потребление памяти при запуске.
 """
 import asyncio
 import sys
+import time
 from loguru import logger
 
 if __name__ == "__main__":
+    startup_profile = "--startup-profile" in sys.argv[1:]
+    if startup_profile:
+        import tracemalloc
+        tracemalloc.start()
+
     try:
+        started = time.perf_counter()
         from bot.main import main
-        asyncio.run(main())
+        timings = {"import": time.perf_counter() - started}
+        asyncio.run(main(startup_profile=startup_profile, timings=timings))
     except ImportError as e:
         print(f"Ошибка импорта: {e}. Убедитесь, что все зависимости установлены.")
         sys.exit(1)
@@ -17,4 +28,4 @@ if __name__ == "__main__":
         print("Бот остановлен по команде пользователя")
     except Exception as e:
         logger.error(f"Критическая ошибка: {e}")
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)